@@ -0,0 +1,218 @@
+"""Load test of the app against the mock ladder server, or any LADDER_BASE_URL.
+
+Each simulated user repeats a visit: open the fixtures, then the match of a random
+fixture. With --mode api a visit calls the same data functions as the pages, with
+--mode pages it runs the page scripts through streamlit's AppTest, which includes
+building the tables and charts but not sending them to a browser. Latency
+percentiles are reported per step and for whole visits.
+
+    python benchmarks/load.py --users 20 --duration 60                  # starts a mock server
+    python benchmarks/load.py --users 20 --latency 0.3 --error-rate 0.05 --cold
+    python benchmarks/load.py --users 5 --mode pages --visits 10
+    python benchmarks/load.py --base-url http://localhost:8765         # use a server already running
+
+Every process serving the app shares the disk cache, so a run starts warm unless
+--cold points it at an empty one.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mock_server  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+PERCENTILES = (50, 90, 99)
+
+
+class Recorder:
+    """Latencies and failures of every step, from all users."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def time(self, step: str, func: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors[step] += 1
+            raise
+        with self._lock:
+            self.latencies[step].append(time.perf_counter() - start)
+        return result
+
+    def merge(self, other: "Recorder") -> None:
+        with self._lock:
+            for step, latencies in other.latencies.items():
+                self.latencies[step].extend(latencies)
+            for step, errors in other.errors.items():
+                self.errors[step] += errors
+
+    def __getstate__(self):
+        return {"latencies": dict(self.latencies), "errors": dict(self.errors)}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.latencies.update(state["latencies"])
+        self.errors.update(state["errors"])
+
+    def report(self, elapsed: float) -> str:
+        header = f"{'step':<10} {'ok':>6} {'errors':>6} {'req/s':>7}" + "".join(
+            f" {f'p{p}':>8}" for p in PERCENTILES
+        )
+        lines = [header + f" {'max':>8}"]
+        for step in sorted(self.latencies.keys() | self.errors.keys()):
+            latencies = sorted(self.latencies[step])
+            line = f"{step:<10} {len(latencies):>6} {self.errors[step]:>6} {len(latencies) / elapsed:>7.1f}"
+            for p in PERCENTILES:
+                line += f" {_percentile(latencies, p) * 1000:>6.0f}ms"
+            lines.append(line + f" {(latencies[-1] if latencies else 0) * 1000:>6.0f}ms")
+        return "\n".join(lines)
+
+
+def _percentile(values: list[float], p: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+def api_visit(recorder: Recorder, rnd: random.Random) -> None:
+    """Fixtures then a match, through the caches the pages use."""
+    import data_api
+    import match_store
+    import prefetch
+    import shared_cache
+
+    cache = shared_cache.get_cache()
+    data, _ = recorder.time(
+        "fixtures",
+        cache.get_stale_while_revalidate,
+        "ladder:summary",
+        data_api.get_ladder,
+        data_api.TTL_SUMMARY,
+        24 * 60 * 60,
+    )
+    fixture = rnd.choice(data["fixtures"])
+
+    def match():
+        home, away = (
+            cache.get_or_load(
+                f"squad:{team_id}", lambda team_id=team_id: data_api.get_squad(team_id), prefetch.FRESHNESS[0][1]
+            )
+            for team_id in (fixture["Home id"], fixture["Away id"])
+        )
+        match_store.get_comparison(home, away)
+
+    recorder.time("match", match)
+
+
+def pages_visit(recorder: Recorder, rnd: random.Random) -> None:
+    """Fixtures then a match, running the page scripts."""
+    from streamlit.testing.v1 import AppTest
+
+    def run(path: str, **query_params) -> AppTest:
+        app = AppTest.from_file(str(ROOT / path), default_timeout=120)
+        app.query_params.update(query_params)
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+        return app
+
+    import data_api
+
+    recorder.time("fixtures", run, "ladder_fixtures.py")
+    fixture = rnd.choice(data_api.get_ladder()["fixtures"])
+    recorder.time("match", run, "pages/Match.py", home_id=str(fixture["Home id"]), away_id=str(fixture["Away id"]))
+
+
+VISITS = {"api": api_visit, "pages": pages_visit}
+
+
+def user(mode: str, recorder: Recorder, seed: int, duration: float, visits: int | None, think: float) -> Recorder:
+    rnd = random.Random(seed)
+    deadline = time.monotonic() + duration
+    done = 0
+    while time.monotonic() < deadline and (visits is None or done < visits):
+        try:
+            recorder.time("visit", VISITS[mode], recorder, rnd)
+        except Exception:
+            pass  # Counted as an error of the step and of the visit
+        done += 1
+        time.sleep(rnd.uniform(0, 2 * think))
+    return recorder
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("api", "pages"), default="api")
+    parser.add_argument("--users", type=int, default=10, help="concurrent users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run for")
+    parser.add_argument("--visits", type=int, help="stop each user after this many visits")
+    parser.add_argument("--think", type=float, default=0.5, help="mean seconds a user waits between visits")
+    parser.add_argument("--cold", action="store_true", help="start from an empty disk cache")
+    parser.add_argument("--base-url", help="server to load, instead of starting a mock server")
+    parser.add_argument("--pages", type=Path, default=mock_server.synthetic.FIXTURES_DIR, help="pages to replay")
+    parser.add_argument("--latency", type=float, default=0.1, help="mock server seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of mock server responses that fail")
+    options = parser.parse_args(argv)
+
+    replay = None
+    if options.base_url is None:
+        replay = mock_server.Replay(options.pages, options.latency, options.jitter, options.error_rate)
+        server = mock_server.start(replay)
+        options.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    # The app modules read these when first imported
+    os.environ["LADDER_BASE_URL"] = options.base_url
+    os.environ["LADDER_PREFETCH"] = "0"
+    if options.cold:
+        scratch = tempfile.mkdtemp(prefix="ladder-load-")
+        os.environ["LADDER_CACHE_PATH"] = str(Path(scratch) / "ladder.sqlite3")
+        os.environ["LADDER_HISTORY_PATH"] = str(Path(scratch) / "ladder_history.jsonl")
+        os.environ["LADDER_METRICS_PATH"] = str(Path(scratch) / "metrics.txt")
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    args = (options.duration, options.visits, options.think)
+    if options.mode == "api":
+        # Users share the process, like the sessions of one replica
+        threads = [
+            threading.Thread(target=user, args=(options.mode, recorder, seed, *args)) for seed in range(options.users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        # AppTest runs one script at a time per process, so every user gets its own
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(options.users, mp_context=context) as pool:
+            futures = [pool.submit(user, options.mode, Recorder(), seed, *args) for seed in range(options.users)]
+            for future in futures:
+                recorder.merge(future.result())
+    elapsed = time.perf_counter() - started
+
+    print(f"{options.users} users, {options.mode} mode, {elapsed:.1f}s against {options.base_url}")
+    print(recorder.report(elapsed))
+    if replay is not None:
+        print(f"Mock server answered {sum(replay.requests.values())} requests for {len(replay.requests)} pages")
+
+
+if __name__ == "__main__":
+    main()
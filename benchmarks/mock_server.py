@@ -0,0 +1,181 @@
+"""Local stand-in for ladder.cycleracing.club, for load tests that must not hit the real site.
+
+Recorded pages are replayed from a directory: summary.html for /summary, ladder.html
+for / and openteam_{id}.html for /openteam/n/{id}. Team pages that were not recorded
+are generated with synthetic.squad_html. Responses carry an ETag and answer matching
+If-None-Match requests with 304, like the real site's caching does.
+
+    python benchmarks/mock_server.py serve --port 8765 --latency 0.2 --jitter 0.1 --error-rate 0.02
+    LADDER_BASE_URL=http://localhost:8765 streamlit run ladder_fixtures.py
+
+    python benchmarks/mock_server.py record --out recorded --teams 20   # save real pages to replay
+
+"""
+
+import argparse
+import hashlib
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import synthetic  # noqa: E402
+
+TEAM_PATH = re.compile(r"^/openteam/n/(\d+)/?$")
+
+
+class Replay:
+    """Pages to serve, with the latency and failures to inject."""
+
+    def __init__(
+        self,
+        pages_dir: Path = synthetic.FIXTURES_DIR,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        roster_size: int = 12,
+    ):
+        self.pages_dir = Path(pages_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate  # Share of requests that hang for 60 seconds
+        self.roster_size = roster_size
+        self.requests: dict[str, int] = {}
+        self._pages: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def page(self, path: str) -> bytes | None:
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            if path in self._pages:
+                return self._pages[path]
+        if path in ("/summary", "/summary/"):
+            body = self._read("summary.html")
+        elif path == "/":
+            body = self._read("ladder.html")
+        elif match := TEAM_PATH.match(path):
+            team_id = int(match.group(1))
+            body = self._read(f"openteam_{team_id}.html") or synthetic.squad_html(team_id, self.roster_size).encode()
+        else:
+            return None
+        with self._lock:
+            self._pages[path] = body
+        return body
+
+    def _read(self, name: str) -> bytes | None:
+        path = self.pages_dir / name
+        return path.read_bytes() if path.exists() else None
+
+    def delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+
+def make_handler(replay: Replay) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(replay.delay())
+            roll = random.random()
+            if roll < replay.timeout_rate:
+                time.sleep(60)
+            elif roll < replay.timeout_rate + replay.error_rate:
+                self._send(503, b"Injected error")
+                return
+
+            body = replay.page(self.path.split("?")[0])
+            if body is None:
+                self._send(404, b"Not found")
+                return
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", etag)
+            else:
+                self._send(200, body, etag)
+
+        def _send(self, status: int, body: bytes, etag: str | None = None):
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def start(replay: Replay, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve in a background thread. Port 0 picks a free port, see server.server_address."""
+    server = ThreadingHTTPServer((host, port), make_handler(replay))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-ladder", daemon=True).start()
+    return server
+
+
+def record(out: Path, teams: int) -> None:
+    """Save the real summary and ladder pages and the first `teams` team pages of the fixtures."""
+    import httpx
+
+    import data_api
+
+    out.mkdir(parents=True, exist_ok=True)
+    with httpx.Client(timeout=30, follow_redirects=True) as client:
+        summary = client.get(data_api.SUMMARY_URL).raise_for_status().text
+        (out / "summary.html").write_text(summary, encoding="utf-8")
+        (out / "ladder.html").write_text(client.get(data_api.BASE_URL).raise_for_status().text, encoding="utf-8")
+        team_ids = []
+        for fixture in data_api.parse_fixtures(summary):
+            for team_id in (fixture["Home id"], fixture["Away id"]):
+                if team_id and team_id not in team_ids:
+                    team_ids.append(team_id)
+        for team_id in team_ids[:teams]:
+            page = client.get(data_api.squad_url(team_id)).raise_for_status().text
+            (out / f"openteam_{team_id}.html").write_text(page, encoding="utf-8")
+            time.sleep(1)  # Be gentle with the real site
+    print(f"Recorded {min(teams, len(team_ids))} teams to {out}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="replay pages")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--pages", type=Path, default=synthetic.FIXTURES_DIR, help="directory of recorded pages")
+    serve.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    serve.add_argument("--jitter", type=float, default=0.0, help="random +/- seconds around the latency")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    serve.add_argument("--timeout-rate", type=float, default=0.0, help="share of requests that hang for 60s")
+    serve.add_argument("--roster-size", type=int, default=12, help="riders in generated team pages")
+    rec = commands.add_parser("record", help="save pages from the real site")
+    rec.add_argument("--out", type=Path, required=True)
+    rec.add_argument("--teams", type=int, default=20)
+    options = parser.parse_args(argv)
+
+    if options.command == "record":
+        record(options.out, options.teams)
+        return
+    replay = Replay(
+        options.pages, options.latency, options.jitter, options.error_rate, options.timeout_rate, options.roster_size
+    )
+    server = start(replay, options.host, options.port)
+    print(f"Replaying {options.pages} on http://{options.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
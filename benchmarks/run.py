@@ -0,0 +1,288 @@
+"""Offline benchmarks of the scraping, parsing and analytics hot paths.
+
+Every case runs on saved or synthetic pages, nothing is fetched. For each case the
+median time per call, the throughput and the peak memory allocated during one call
+(tracemalloc) are reported.
+
+    python benchmarks/run.py                  # run everything
+    python benchmarks/run.py -k ladder        # only cases whose name contains "ladder"
+    python benchmarks/run.py --save           # store the results as the new baseline
+    python benchmarks/run.py --check          # fail if a case got slower than the baseline
+    python benchmarks/run.py --all-backends   # also time the parsers of data_parse.BACKENDS not in use
+
+Timings depend on the machine, so save the baseline on the machine that runs the check.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import data_api  # noqa: E402
+import data_parse  # noqa: E402
+import league  # noqa: E402
+import rankings_view  # noqa: E402
+import rider_index  # noqa: E402
+import synthetic  # noqa: E402
+from data_plots import match_power_plot  # noqa: E402
+from data_stats import COL_BASE, COL_OTHER, COL_WATTS, COL_WKG, compare_rosters  # noqa: E402
+from table_style import gradient_css  # noqa: E402
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+MIN_SECONDS = 0.5  # Repeat each case for at least this long
+MIN_RUNS = 3
+TOLERANCE = 1.25  # A case regresses when it is this many times slower, or uses this much more memory
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[], tuple]  # Builds the arguments, not timed
+    func: Callable
+    items: int  # Rows, fixtures or riders handled per call
+    unit: str
+
+
+def _fixture(name: str) -> str:
+    return (synthetic.FIXTURES_DIR / name).read_text(encoding="utf-8")
+
+
+def _saved_squads() -> tuple[dict, dict]:
+    return tuple(json.loads(_fixture(f"openteam_{team_id}.json")) | {"id": team_id} for team_id in (101, 202))
+
+
+def _synthetic_squads(n_riders: int) -> tuple[dict, dict]:
+    return tuple(synthetic.squad_payload(team_id, n_riders) | {"id": team_id} for team_id in (101, 202))
+
+
+def _with_backend(backend: str, parse: Callable) -> Callable:
+    def run(html: str):
+        data_parse.set_parser_backend(backend)
+        return parse(html)
+
+    return run
+
+
+def _power_plot_input(home: dict, away: dict) -> tuple:
+    return (compare_rosters(home, away)[COL_BASE + COL_WATTS + COL_WKG + COL_OTHER],)
+
+
+def _rankings_page(n_teams: int) -> tuple:
+    rankings = [asdict(ranking) for ranking in data_api.parse_ladder_table(synthetic.ladder_html(n_teams))]
+    filters = {"Region": "2", "Zombie": "Active", "Movement": "▲"}
+    return rankings_view.RankingsView.build(rankings), filters
+
+
+def _show_rankings_page(view: rankings_view.RankingsView, filters: dict[str, str]):
+    rows = view.select(filters, "Wins", descending=True)
+    return view.frame(rows[50:100])
+
+
+def _page(name: str | None, make: Callable[..., str], *args) -> Callable[[], tuple]:
+    """Setup reading a saved fixture when a name is given, generating the page otherwise."""
+    if name:
+        return lambda: (_fixture(name),)
+    return lambda: (make(*args),)
+
+
+def cases(backends: list[str]) -> list[Case]:
+    all_cases = []
+    for backend in backends:
+        summary_sizes = (("saved", "summary.html", 3, 20), ("1k", None, 10, 100), ("6k", None, 30, 200))
+        for label, saved, days, per_day in summary_sizes:
+            all_cases.append(
+                Case(
+                    f"parse_fixtures[{backend}-{label}]",
+                    _page(saved, synthetic.summary_html, days, per_day),
+                    _with_backend(backend, data_api.parse_fixtures),
+                    days * per_day,
+                    "fixtures",
+                )
+            )
+        for label, saved, n_teams in (("saved", "ladder.html", 500), ("2k", None, 2000), ("5k", None, 5000)):
+            all_cases.append(
+                Case(
+                    f"parse_ladder_table[{backend}-{label}]",
+                    _page(saved, synthetic.ladder_html, n_teams),
+                    _with_backend(backend, data_api.parse_ladder_table),
+                    n_teams,
+                    "teams",
+                )
+            )
+
+    for label, saved, n_riders in (("saved", "openteam_101.html", 12), ("200", None, 200), ("500", None, 500)):
+        page = _page(saved, synthetic.squad_html, 101, n_riders)
+        all_cases.append(
+            Case(f"parse_squad[{label}]", lambda page=page: (*page(), 101), data_api.parse_squad, n_riders, "riders")
+        )
+    all_cases.append(
+        Case(
+            "parse_squad[500-thisteam]",
+            lambda: (synthetic.squad_html(101, 500), 101, ("thisteam",)),
+            data_api.parse_squad,
+            1,
+            "teams",
+        )
+    )
+
+    for label, n_riders in (("saved", 12), ("200", 200), ("500", 500)):
+        squads = _saved_squads if label == "saved" else (lambda n=n_riders: _synthetic_squads(n))
+        all_cases.append(Case(f"compare_rosters[{label}]", squads, compare_rosters, 2 * n_riders, "riders"))
+        all_cases.append(
+            Case(
+                f"match_power_plot[{label}]",
+                lambda squads=squads: _power_plot_input(*squads()),
+                match_power_plot,
+                2 * n_riders,
+                "riders",
+            )
+        )
+        all_cases.append(
+            Case(
+                f"gradient_css[{label}]",
+                lambda squads=squads: (compare_rosters(*squads()), COL_WATTS + COL_WKG),
+                gradient_css,
+                2 * n_riders,
+                "riders",
+            )
+        )
+
+    for n_teams in (500, 2000):
+        all_cases.append(
+            Case(
+                f"build_league[{n_teams}]",
+                lambda n=n_teams: ([synthetic.squad_payload(i, 8 + i % 10) | {"id": i} for i in range(1, n + 1)],),
+                league.build_league,
+                n_teams,
+                "teams",
+            )
+        )
+        all_cases.append(
+            Case(
+                f"build_rider_index[{n_teams}]",
+                lambda n=n_teams: ([synthetic.squad_payload(i, 8 + i % 10) | {"id": i} for i in range(1, n + 1)],),
+                rider_index.build_rider_index,
+                n_teams,
+                "teams",
+            )
+        )
+    for label, n_teams in (("2k", 2000), ("20k", 20000)):
+        all_cases.append(
+            Case(
+                f"rankings_page[{label}]",
+                lambda n=n_teams: _rankings_page(n),
+                _show_rankings_page,
+                1,
+                "pages",
+            )
+        )
+    return all_cases
+
+
+def _has_lxml() -> bool:
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def measure(case: Case) -> dict:
+    """Median seconds per call, throughput and peak traced memory of one case."""
+    args = case.setup()
+    backend = data_parse.get_parser_backend()
+    try:
+        case.func(*args)  # Warm up imports and caches
+        times = []
+        started = time.perf_counter()
+        while len(times) < MIN_RUNS or time.perf_counter() - started < MIN_SECONDS:
+            start = time.perf_counter()
+            case.func(*args)
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        case.func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        data_parse.set_parser_backend(backend)
+
+    seconds = statistics.median(times)
+    return {
+        "seconds": seconds,
+        "throughput": case.items / seconds,
+        "unit": case.unit,
+        "peak_kb": peak / 1024,
+        "runs": len(times),
+    }
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Cases that are slower or use more memory than the baseline allows."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["seconds"] > base["seconds"] * tolerance:
+            regressions.append(f"{name}: {result['seconds'] * 1000:.2f} ms, baseline {base['seconds'] * 1000:.2f} ms")
+        if result["peak_kb"] > base["peak_kb"] * tolerance:
+            regressions.append(f"{name}: peak {result['peak_kb']:.0f} KB, baseline {base['peak_kb']:.0f} KB")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--save", action="store_true", help="store the results in the baseline file")
+    parser.add_argument("--check", action="store_true", help="exit with 1 if a case regressed")
+    parser.add_argument("--all-backends", action="store_true", help="parse with every available parser backend")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    options = parser.parse_args(argv)
+
+    stored = json.loads(options.baseline.read_text()) if options.baseline.exists() else {"cases": {}}
+    baseline = stored["cases"]
+    results = {}
+    print(f"{'case':<42} {'time':>10} {'throughput':>20} {'peak':>10} {'vs base':>8}")
+    if options.all_backends:
+        backends = [backend for backend in data_parse.BACKENDS if backend != "lxml" or _has_lxml()]
+    else:
+        backends = [data_parse.get_parser_backend()]
+    for case in cases(backends):
+        if options.filter not in case.name:
+            continue
+        result = results[case.name] = measure(case)
+        base = baseline.get(case.name)
+        ratio = f"{result['seconds'] / base['seconds']:.2f}x" if base else "-"
+        print(
+            f"{case.name:<42} {result['seconds'] * 1000:>8.2f}ms "
+            f"{result['throughput']:>12,.0f} {case.unit + '/s':<7} {result['peak_kb']:>8,.0f}KB {ratio:>8}"
+        )
+
+    if options.save:
+        stored = {
+            "machine": {"python": platform.python_version(), "platform": platform.platform()},
+            "cases": {**baseline, **results},
+        }
+        options.baseline.write_text(json.dumps(stored, indent=1) + "\n")
+        print(f"Baseline saved to {options.baseline}")
+
+    if options.check:
+        regressions = compare(results, baseline, options.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Cold start of every page: import time and first render, checked against a budget.
+
+Each page is measured in a fresh interpreter, like a replica scaled up from zero or
+just redeployed, with an empty cache and the pages served by mock_server. Reported
+per page: the time to import streamlit, to import the modules the page imports, to
+run the page for the first time, and the slowest of those imports.
+
+    python benchmarks/startup.py              # report
+    python benchmarks/startup.py --check      # exit with 1 if a page is over its budget
+    python benchmarks/startup.py --top 20     # list more of the slowest imports
+
+Timings depend on the machine, the budgets are for a small container.
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+ROOT = Path(__file__).resolve().parent.parent
+# Milliseconds allowed for importing the page's modules and for its first run
+BUDGETS = {
+    "ladder_fixtures.py": {"imports": 700, "first_run": 1000},
+    "pages/Match.py": {"imports": 700, "first_run": 2000},
+    "pages/Rankings.py": {"imports": 700, "first_run": 1000},
+    "pages/Status.py": {"imports": 700, "first_run": 800},
+}
+MARKER = "startup-marker"
+
+
+def page_imports(page: Path) -> list[str]:
+    """Top level modules a page script imports, besides streamlit."""
+    modules = []
+    for node in ast.parse(page.read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return [module for module in dict.fromkeys(modules) if module.split(".")[0] != "streamlit"]
+
+
+def _slowest_imports(importtime: str, top: int) -> list[tuple[str, float]]:
+    """Slowest imports, with their own dependencies, logged by -X importtime between the markers."""
+    lines = importtime.split(MARKER)[1].splitlines()
+    imports = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Only count modules the page (not one of its imports) imports, nested ones are included
+        if name.startswith(" ") and not name.startswith("  "):
+            imports.append((name.strip(), int(cumulative) / 1000))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+
+
+def measure_child(page: str) -> None:
+    """Measure one page in this interpreter and print the results as JSON."""
+    import mock_server
+
+    server = mock_server.start(mock_server.Replay())
+    scratch = tempfile.mkdtemp(prefix="ladder-startup-")
+    os.environ.update(
+        LADDER_BASE_URL=f"http://127.0.0.1:{server.server_address[1]}",
+        LADDER_PREFETCH="0",
+        LADDER_CACHE_PATH=str(Path(scratch) / "ladder.sqlite3"),
+        LADDER_HISTORY_PATH=str(Path(scratch) / "ladder_history.jsonl"),
+        LADDER_METRICS_PATH=str(Path(scratch) / "metrics.txt"),
+    )
+
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+
+    streamlit_ms = (time.perf_counter() - start) * 1000
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(ROOT / page), default_timeout=120)
+    app.query_params.update({"home_id": "101", "away_id": "202"} if page.endswith("Match.py") else {})
+
+    print(MARKER, file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    for module in page_imports(ROOT / page):
+        __import__(module)
+    imports_ms = (time.perf_counter() - start) * 1000
+    print(MARKER, file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    app.run()
+    first_run_ms = (time.perf_counter() - start) * 1000
+    errors = [exception.message for exception in app.exception]
+    print(json.dumps({"streamlit": streamlit_ms, "imports": imports_ms, "first_run": first_run_ms, "errors": errors}))
+
+
+def measure(page: str, top: int) -> dict:
+    """Run measure_child for a page in a fresh interpreter."""
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", __file__, "--child", page],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        check=True,
+    )
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    result["slowest"] = _slowest_imports(child.stderr, top)
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="exit with 1 if a page is over its budget")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per page")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+    if options.child:
+        measure_child(options.child)
+        return 0
+
+    over = []
+    for page, budget in BUDGETS.items():
+        result = measure(page, options.top)
+        print(f"{page}")
+        print(f"  streamlit {result['streamlit']:>7.0f}ms")
+        for stage in ("imports", "first_run"):
+            flag = "  OVER BUDGET" if result[stage] > budget[stage] else ""
+            print(f"  {stage:<9} {result[stage]:>7.0f}ms  budget {budget[stage]}ms{flag}")
+            if flag:
+                over.append(f"{page} {stage}")
+        for module, ms in result["slowest"]:
+            print(f"    {ms:>7.0f}ms  {module}")
+        for error in result["errors"]:
+            print(f"  ERROR {error}")
+            over.append(f"{page} failed")
+
+    if options.check and over:
+        print(f"Over budget: {', '.join(over)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Synthetic ladder.cycleracing.club pages, shaped like the real ones.
+
+Pages are generated from a seed, so every size is reproducible. Running this file
+rewrites the saved fixtures in benchmarks/fixtures, which the benchmarks use for
+the sizes the real site serves today.
+"""
+
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+ROUTES = ["Watopia Flat", "Innsbruck KOM", "Richmond UCI", "London Loop", "Makuri Pretzel"]
+POWERUPS = ["Feather", "Aero", "Draft", "Burrito", "Steamroller"]
+INTERVALS = [5, 10, 15, 30, 60, 120, 300, 600, 1200, 1800]
+# Power at each interval relative to the rider's FTP
+CURVE = [3.2, 3.0, 2.8, 2.2, 1.7, 1.35, 1.15, 1.05, 1.0, 0.95]
+
+
+def summary_html(n_days: int = 3, per_day: int = 20, seed: int = 1) -> str:
+    """Summary page with `per_day` fixtures on each of `n_days` days, starting today."""
+    rnd = random.Random(seed)
+    rows = []
+    for day in range(n_days):
+        label = "Today" if day == 0 else (date.today() + timedelta(days=day)).isoformat()
+        rows.append(f'<tr class="dayBounds"><td colspan="5"> {label} </td></tr>')
+        for i in range(per_day):
+            status = "fixToday" if day == 0 else "fixFuture"
+            home, away = rnd.randint(1, 5000), rnd.randint(1, 5000)
+            powerups = "".join(f'<img class="pup-small" alt="{p}" src="pup.png">' for p in rnd.sample(POWERUPS, 2))
+            rows.append(
+                f'<tr class="fixRow {status}" data-id="{day * 1000 + i}">'
+                f"<td> {rnd.randint(0, 23):02d}:{rnd.choice(['00', '15', '30', '45'])} </td>"
+                f'<td><span class="teamOpener" data-team-id="{home}">Team &amp; {home}</span></td>'
+                f'<td><span class="teamOpener" data-team-id="{away}">Team {away}</span></td>'
+                f"<td>{rnd.choice(ROUTES)}</td><td>{powerups}</td></tr>"
+            )
+        rows.append('<tr class="blankFixturesRow"><td></td></tr>')
+    return (
+        "<html><head><title>Summary</title><script>var fixtures = '<tr>';</script></head><body>"
+        '<div class="fixtureTab"><table><tbody>' + "\n".join(rows) + "</tbody></table></div></body></html>"
+    )
+
+
+def _form_square(rnd: random.Random) -> str:
+    result = rnd.choice(["W", "L", "", "W"])
+    if result == "W" and rnd.random() < 0.3:
+        return '<div class="formSquare win"><span style="text-decoration:underline">W</span></div>'
+    return f'<div class="formSquare">{result or " "}</div>'
+
+
+def ladder_html(n_teams: int = 500, seed: int = 2) -> str:
+    """Ladder page with `n_teams` rows."""
+    rnd = random.Random(seed)
+    rows = []
+    for position in range(1, n_teams + 1):
+        zombie = " zombieTeamRow" if rnd.random() < 0.1 else ""
+        form = "".join(_form_square(rnd) for _ in range(5))
+        move = rnd.choice(["staticMove", "upMove", "downMove", None])
+        if move is None:
+            move_div = ""
+        elif move == "staticMove":
+            move_div = '<div class="movebubble staticMove">=</div>'
+        else:
+            arrow = "▲" if move == "upMove" else "▼"
+            move_div = f'<div class="movebubble {move}">{arrow} {rnd.randint(1, 12)}</div>'
+        bonus = '<span class="badge">Bonus Drop</span>' if rnd.random() < 0.05 else ""
+        rows.append(
+            f'<tr class="ladderRow{zombie}" data-team-id="{position * 7}" data-team-region="{rnd.randint(1, 3)}">'
+            f'<td class="nposCol"> {position} </td><td class="highlightBold">Team {position}</td>'
+            f'<td class="clubReplace">Club {position % 40}</td>'
+            f'<td><span class="d-flex">{form}</span></td><td>{move_div}{bonus}</td></tr>'
+        )
+    return (
+        '<html><body><table class="template-ladder"><thead><tr><th>Pos</th></tr></thead><tbody>'
+        + "\n".join(rows)
+        + "</tbody></table></body></html>"
+    )
+
+
+def squad_payload(team_id: int, n_riders: int = 12) -> dict:
+    """The Ladder.* objects of a team page, with `n_riders` riders in the roster."""
+    rnd = random.Random(team_id)
+    roster = []
+    for i in range(n_riders):
+        weight = rnd.uniform(55, 95)
+        ftp_wkg = rnd.uniform(3, 5.5)
+        ninety = {}
+        for seconds, factor in zip(INTERVALS, CURVE):
+            # Riders regularly have no data for some intervals
+            watts = 0 if rnd.random() < 0.05 else round(ftp_wkg * factor * weight)
+            ninety[f"w{seconds}"] = watts
+            ninety[f"wkg{seconds}"] = round(watts / weight, 2)
+        ninety.update({"wkg": round(ftp_wkg, 2), "watts": round(ftp_wkg * weight), "wtotal": 0, "wkgtotal": 0})
+        roster.append(
+            {
+                "id": team_id * 1000 + i,
+                "ZPName": f"Rider {team_id}-{i}",
+                "zwiftData": {"ftp": round(ftp_wkg * weight)},
+                "powerMax": {"ninety": ninety},
+            }
+        )
+    return {
+        "thisteam": {"name": f"Team {team_id}", "club": f"Club {team_id % 40}", "LadderPos": team_id % 100},
+        "pageclub": {"id": team_id % 40, "name": f"Club {team_id % 40}"},
+        "stats": {"won": rnd.randint(0, 30), "lost": rnd.randint(0, 30)},
+        "team": {"id": team_id},
+        "belts": {"held": []},
+        "roster": roster,
+    }
+
+
+def squad_html(team_id: int, n_riders: int = 12) -> str:
+    """Team page (/openteam/n/{id}) embedding squad_payload in a script."""
+    payload = squad_payload(team_id, n_riders)
+    script = "\n".join(f"Ladder.{name} = {json.dumps(value)};" for name, value in payload.items())
+    return (
+        "<html><head><script>var Ladder = Ladder || {};</script></head><body><div>Team</div>"
+        f"<script>\n{script}\n</script></body></html>"
+    )
+
+
+def write_fixtures() -> None:
+    """Save the pages the benchmarks load from disk."""
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    (FIXTURES_DIR / "summary.html").write_text(summary_html(), encoding="utf-8")
+    (FIXTURES_DIR / "ladder.html").write_text(ladder_html(), encoding="utf-8")
+    for team_id in (101, 202):
+        (FIXTURES_DIR / f"openteam_{team_id}.html").write_text(squad_html(team_id), encoding="utf-8")
+        (FIXTURES_DIR / f"openteam_{team_id}.json").write_text(
+            json.dumps(squad_payload(team_id), indent=1), encoding="utf-8"
+        )
+
+
+if __name__ == "__main__":
+    write_fixtures()
@@ -1,10 +1,81 @@
+import asyncio
 import json
+import os
 import re
-from dataclasses import dataclass
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import asdict, dataclass
 from datetime import date, datetime, timedelta
 
-import httpx
-from bs4 import BeautifulSoup
+import numpy as np
+
+import data_cache
+import data_http
+import data_parse
+import tracing
+from lazy_imports import lazy_import
+from logger_config import logger
+
+httpx = lazy_import("httpx")
+
+# Point at a stand-in, e.g. benchmarks/mock_server.py, with LADDER_BASE_URL=http://localhost:8765
+BASE_URL = os.environ.get("LADDER_BASE_URL", "https://ladder.cycleracing.club").rstrip("/")
+SUMMARY_URL = f"{BASE_URL}/summary"
+SQUADS_URL = f"{BASE_URL}/openteam/n/"  # Team pages are SQUADS_URL followed by the team id
+
+# Seconds a cached page is served without revalidating it with the upstream
+TTL_SUMMARY = 5 * 60
+TTL_LADDER = 10 * 60
+TTL_SQUAD = 60 * 60
+
+# Ladder.<name> payloads embedded in a team page
+SQUAD_KEYS = ("thisteam", "pageclub", "stats", "team", "belts", "roster")
+
+
+def squad_url(team_id: int) -> str:
+    """URL of a team's page."""
+    return f"{SQUADS_URL}{team_id}"
+
+
+async def _aget_cached(url: str, ttl: float, parse: Callable[[str], object], page: str = "page") -> object:
+    """Fetch a page through the disk cache and return its parsed data.
+
+    Fresh entries are served without contacting the upstream. Stale ones are revalidated
+    with their ETag/Last-Modified and only parsed again when the page actually changed.
+
+    Args:
+        url (str): URL to fetch
+        ttl (float): Seconds an entry is considered fresh
+        parse (Callable): Turns the page text into JSON serializable data
+        page (str): Kind of page, labels its fetch and parse spans and cache counters
+
+    Returns:
+        object: Parsed page data
+
+    """
+    entry = data_cache.get(url)
+    if entry and entry.age < ttl:
+        tracing.count("cache", page=page, result="hit")
+        return data_cache.loads(entry.data)
+
+    with tracing.span("fetch", page=page):
+        response = await data_http.fetch(url, entry.validators() if entry else None)
+    if entry and (response.status_code == 304 or data_cache.version_of(response.content) == entry.version):
+        tracing.count("cache", page=page, result="revalidated")
+        data_cache.mark_fresh(url)
+        return data_cache.loads(entry.data)
+
+    tracing.count("cache", page=page, result="miss")
+    # Parse off the event loop so other downloads keep flowing meanwhile
+    with tracing.span("parse", page=page):
+        data = await asyncio.to_thread(parse, response.text)
+    data_cache.put(
+        url,
+        response.content,
+        data_cache.dumps(data),
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+    return data
 
 
 def format_timedelta(td: timedelta) -> str:
@@ -29,26 +100,57 @@ def format_timedelta(td: timedelta) -> str:
     return f"{total_hours}h {minutes}m"
 
 
-def parse_fixtures(html_content: str) -> list[dict]:
-    """Parse fixture table data from the provided HTML content.
+def format_timedeltas(seconds: np.ndarray) -> np.ndarray:
+    """Vectorized format_timedelta, for an array of durations in seconds.
 
     Args:
-        html_content (str): Raw HTML content containing the fixture table
-
+        seconds: Durations in seconds, e.g. (date_time - now) / np.timedelta64(1, "s")
     Returns:
-        List[Dict]: List of fixtures with parsed data
+        np.ndarray: Strings formatted like format_timedelta does
 
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-    fixture_table = soup.find("div", class_="fixtureTab")
+    seconds = np.asarray(seconds, dtype=np.float64)
+    total_hours = (seconds // 3600).astype(np.int64)
+    minutes = ((seconds % 3600) // 60).astype(np.int64).astype(str)
+    days, hours = np.divmod(total_hours, 24)
+    add = np.char.add
+    short = add(add(add(total_hours.astype(str), "h "), minutes), "m")
+    long = add(add(add(add(add(days.astype(str), "d "), hours.astype(str)), "h "), minutes), "m")
+    return np.where(seconds < 0, "Past", np.where(total_hours > 24, long, short)).astype(object)
+
+
+def _fixture_rows(stream: str | Iterable[str]):
+    """Rows of the fixture table, produced by the selected parser backend."""
+    backend = data_parse.get_parser_backend()
+    if backend == "stream":
+        return data_parse.iter_rows(stream, "div", "fixtureTab")
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(stream if isinstance(stream, str) else "".join(stream), backend)
+    return soup.find("div", class_="fixtureTab").find_all("tr")
+
 
-    fixtures = []
+def iter_fixtures(stream: str | Iterable[str]) -> Iterator[dict]:
+    """Parse fixtures one row at a time.
+
+    With the stream parser backend each fixture is yielded as soon as its row has been
+    read, so callers that stop early never read or keep the rest of the page.
+
+    Args:
+        stream (str | Iterable[str]): Raw HTML content containing the fixture table,
+            whole or as consecutive chunks, e.g. from data_http.iter_stream
+
+    Returns:
+        Iterator[Dict]: Fixtures with parsed data, see parse_fixtures
+
+    """
     current_date = None
 
     # Iterate through all rows in the table
-    for row in fixture_table.find_all("tr"):
+    for row in _fixture_rows(stream):
+        row_classes = row.get("class", [])
         # Check if it's a date boundary row
-        if "dayBounds" in row.get("class", []):
+        if "dayBounds" in row_classes:
             current_date = row.find("td").text.strip().lower()
             if current_date == "today":
                 current_date = date.today()
@@ -57,11 +159,11 @@ def parse_fixtures(html_content: str) -> list[dict]:
             continue
 
         # Skip blank fixture rows
-        if "blankFixturesRow" in row.get("class", []):
+        if "blankFixturesRow" in row_classes:
             continue
 
         # Process fixture rows
-        if "fixFuture" in row.get("class", []) or "fixToday" in row.get("class", []):
+        if "fixFuture" in row_classes or "fixToday" in row_classes:
             # Extract data from the row
             cells = row.find_all("td")
             if len(cells) >= 5:
@@ -77,10 +179,11 @@ def parse_fixtures(html_content: str) -> list[dict]:
                 away_team_name = away_team_span.text.strip() if away_team_span else None
 
                 # Create fixture dictionary
-                fixture = {
+                start_time = cells[0].text.strip()
+                yield {
                     "Date": current_date,
-                    "Time": cells[0].text.strip(),
-                    "date_time": datetime.strptime(f"{current_date} {cells[0].text.strip()}", "%Y-%m-%d %H:%M"),
+                    "Time": start_time,
+                    "date_time": datetime.strptime(f"{current_date} {start_time}", "%Y-%m-%d %H:%M"),
                     "Home id": home_team_id,
                     "Home Name": home_team_name,
                     "Away id": away_team_id,
@@ -88,53 +191,143 @@ def parse_fixtures(html_content: str) -> list[dict]:
                     "Route": cells[3].text.strip(),
                     "Power ups": powerups,
                     "Fixture id": row.get("data-id"),
-                    "Status": "future" if "fixFuture" in row.get("class", []) else "today",
+                    "Status": "future" if "fixFuture" in row_classes else "today",
                 }
-                fixtures.append(fixture)
 
-    return fixtures
 
+def parse_fixtures(html_content: str) -> list[dict]:
+    """Parse fixture table data from the provided HTML content.
+
+    Args:
+        html_content (str): Raw HTML content containing the fixture table
+
+    Returns:
+        List[Dict]: List of fixtures with parsed data
+
+    """
+    return list(iter_fixtures(html_content))
 
-def get_squad(team_id: int) -> dict:
-    """Parse player cards from the MVP section.
+
+def parse_squad(html_content: str | bytes, team_id: int, keys: Iterable[str] = SQUAD_KEYS) -> dict:
+    """Extract the team data embedded in a team page's scripts.
 
     Args:
-        html_content (str): Raw HTML content containing the player cards
+        html_content (str | bytes): Raw HTML of an /openteam/n/{id} page
+        team_id (int): Id of the team the page belongs to
+        keys (Iterable[str]): Payloads to extract, all of SQUAD_KEYS by default.
+            Payloads that are not asked for are skipped without being decoded.
 
     Returns:
-        List[PlayerCard]: List of parsed player data
+        Dict: The team id, the requested payloads ({} when missing from the page)
+            and a version hash of those payloads
 
     """
-    try:
-        with httpx.Client() as client:
-            response = client.get(f"https://ladder.cycleracing.club/openteam/n/{team_id}")
-            response.raise_for_status()
-    except httpx.RequestError as e:
-        print(f"Error fetching squad: {e}")
-
-    soup = BeautifulSoup(response.content, "html.parser")
-    # find the script with the data
-    script_tag = soup.find("script", string=re.compile(r"Ladder\.thisteam\s*="))
-    script_content = script_tag.string
-    str_data = {
-        "thisteam": re.search(r"Ladder\.thisteam\s*=\s*({.*?});", script_content, re.DOTALL),
-        "pageclub": re.search(r"Ladder\.pageclub\s*=\s*({.*?});", script_content, re.DOTALL),
-        "stats": re.search(r"Ladder\.stats\s*=\s*({.*?});", script_content, re.DOTALL),
-        "team": re.search(r"Ladder\.team\s*=\s*({.*?});", script_content, re.DOTALL),
-        "belts": re.search(r"Ladder\.belts\s*=\s*({.*?});", script_content, re.DOTALL),
-        "roster": re.search(r"Ladder\.roster\s*=\s*(\[.*?\]);", script_content, re.DOTALL),
-    }
+    keys = tuple(keys)
+    if data_parse.get_parser_backend() == "stream":
+        with tracing.span("squad.extract"):
+            payloads = data_parse.extract_assignments(html_content, keys, marker="thisteam")
+    else:
+        from bs4 import BeautifulSoup
+
+        with tracing.span("squad.soup"):
+            soup = BeautifulSoup(html_content, data_parse.get_parser_backend())
+            # find the script with the data
+            script_tag = soup.find("script", string=re.compile(r"Ladder\.thisteam\s*="))
+            script_content = script_tag.string
+        with tracing.span("squad.extract"):
+            payloads = {}
+            for key in keys:
+                pattern = r"(\[.*?\]);" if key == "roster" else r"({.*?});"
+                value = re.search(rf"Ladder\.{key}\s*=\s*{pattern}", script_content, re.DOTALL)
+                if value:
+                    payloads[key] = json.loads(value.group(1))
 
     json_data = {"id": team_id}
-    for key, value in str_data.items():
-        if value:
-            json_data[key] = json.loads(value.group(1))
-        else:
-            json_data[key] = {}
+    for key in keys:
+        json_data[key] = payloads.get(key, {})
+    # Identifies this state of the team, for caching anything derived from it. Only the
+    # extracted payloads are hashed, so changes to the rest of the page (ads, nav) do not count.
+    json_data["version"] = data_cache.version_of(data_cache.dumps(json_data).encode())
     return json_data
 
 
-def get_ladder(url: str = "https://ladder.cycleracing.club/summary") -> dict[str, list[dict]]:
+async def aget_squad(team_id: int, max_age: float | None = None, keys: Iterable[str] = SQUAD_KEYS) -> dict:
+    """Fetch and parse a team page through the shared connection pool.
+
+    Args:
+        team_id (int): Id of the team to fetch
+        max_age (float): Revalidate a cached copy older than this many seconds,
+            instead of after TTL_SQUAD
+        keys (Iterable[str]): Payloads to return. The cache always keeps all of them,
+            so a page is never fetched again just because another caller wants more.
+
+    Returns:
+        Dict: Parsed team data, see parse_squad
+
+    """
+    ttl = TTL_SQUAD if max_age is None else min(max_age, TTL_SQUAD)
+    squad = await _aget_cached(squad_url(team_id), ttl, lambda text: parse_squad(text, team_id), page="squad")
+    keys = tuple(keys)
+    if keys == SQUAD_KEYS:
+        return squad
+    return {"id": squad["id"], **{key: squad.get(key, {}) for key in keys}, "version": squad.get("version")}
+
+
+async def aget_squads(team_ids: Iterable[int]) -> dict[int, dict]:
+    """Fetch and parse many team pages concurrently.
+
+    Concurrency is bounded by data_http.MAX_CONCURRENCY. Teams that fail to load
+    are logged and left out of the result instead of failing the whole batch.
+
+    Args:
+        team_ids (Iterable[int]): Ids of the teams to fetch, duplicates are fetched once
+
+    Returns:
+        Dict: Parsed team data by team id
+
+    """
+    team_ids = list(dict.fromkeys(team_ids))
+    results = await asyncio.gather(*(aget_squad(team_id) for team_id in team_ids), return_exceptions=True)
+    squads = {}
+    for team_id, result in zip(team_ids, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Error fetching squad {team_id}: {result}")
+        else:
+            squads[team_id] = result
+    return squads
+
+
+def get_squad(team_id: int, max_age: float | None = None, keys: Iterable[str] = SQUAD_KEYS) -> dict:
+    """Fetch and parse the data of a single team.
+
+    Args:
+        team_id (int): Id of the team to fetch
+        max_age (float): Revalidate a cached copy older than this many seconds
+        keys (Iterable[str]): Payloads to return, e.g. ("thisteam", "roster")
+
+    Returns:
+        Dict: Parsed team data, see parse_squad
+
+    """
+    try:
+        return data_http.run(aget_squad(team_id, max_age, keys))
+    except httpx.RequestError as e:
+        logger.warning(f"Error fetching squad: {e}")
+        raise
+
+
+def get_squads(team_ids: Iterable[int]) -> dict[int, dict]:
+    """Fetch and parse many teams concurrently, see aget_squads."""
+    return data_http.run(aget_squads(team_ids))
+
+
+def parse_summary(html_content: str) -> dict:
+    """Parse the summary page into its fixtures and a version hash of those fixtures."""
+    fixtures = parse_fixtures(html_content)
+    return {"fixtures": fixtures, "version": data_cache.version_of(data_cache.dumps(fixtures).encode())}
+
+
+def get_ladder(url: str = SUMMARY_URL) -> dict[str, list[dict]]:
     """Fetch and parse fixtures from the website.
 
     Args:
@@ -145,25 +338,48 @@ def get_ladder(url: str = "https://ladder.cycleracing.club/summary") -> dict[str
 
     """
     try:
-        with httpx.Client() as client:
-            response = client.get(url)
-            response.raise_for_status()
+        return data_http.run(_aget_cached(url, TTL_SUMMARY, parse_summary, page="summary"))
     except httpx.RequestError as e:
-        print(f"Error fetching fixtures: {e}")
+        logger.warning(f"Error fetching fixtures: {e}")
         return {}
 
-    # Parse the page
-    data = {"fixtures": parse_fixtures(response.text)}
-    return data
+
+def stream_fixtures(url: str = SUMMARY_URL) -> Iterator[dict]:
+    """Fetch fixtures, yielding each one as soon as it has been downloaded and parsed.
+
+    A fresh cached copy of the page is used when there is one. Otherwise the page is
+    streamed from the website and the download stops when the caller stops iterating,
+    e.g. after today's fixtures or the first fixture of a team.
+
+    Args:
+        url (str): URL to fetch fixtures from
+
+    Returns:
+        Iterator[Dict]: Parsed fixtures in page order
+
+    """
+    entry = data_cache.get(url)
+    if entry and entry.age < TTL_SUMMARY:
+        yield from data_cache.loads(entry.data)["fixtures"]
+        return
+    try:
+        yield from iter_fixtures(data_http.iter_stream(url))
+    except httpx.RequestError as e:
+        logger.warning(f"Error fetching fixtures: {e}")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FormResult:
     result: str  # 'W' for win, 'L' for loss, 'D' for defend
     is_defend: bool = False  # True for defended wins
 
 
-@dataclass
+# Every possible form square. FormResult is immutable, so parsed ladders share these.
+FORM_SQUARES = {(result, is_defend): FormResult(result, is_defend) for result in "WL" for is_defend in (False, True)}
+FORM_BLANK = FormResult("")
+
+
+@dataclass(slots=True)
 class TeamRanking:
     position: int
     team_name: str
@@ -180,7 +396,7 @@ class TeamRanking:
 def parse_form_square(square_div) -> FormResult:
     """Parse a single form square to get the result and if it was a defend."""
     if not square_div.text.strip():
-        return FormResult("")
+        return FORM_BLANK
 
     # Check if it's a defended win (underlined W)
     span = square_div.find("span")
@@ -188,20 +404,30 @@ def parse_form_square(square_div) -> FormResult:
 
     result = square_div.text.strip()
     if result and result[0] in "WL":
-        return FormResult(result[0], is_defend)
-    return FormResult("")
+        return FORM_SQUARES[result[0], is_defend]
+    return FORM_BLANK
 
 
-def parse_ladder_table(html_content: str) -> list[TeamRanking]:
-    """Parse the ladder table and return a list of team rankings."""
-    soup = BeautifulSoup(html_content, "html.parser")
+def _ladder_rows(html_content: str):
+    """Team rows of the ladder table, produced by the selected parser backend."""
+    backend = data_parse.get_parser_backend()
+    if backend == "stream":
+        rows = data_parse.iter_rows(html_content, "table", "template-ladder", section="tbody")
+        return [row for row in rows if "ladderRow" in row.get("class", [])]
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, backend)
     ladder_table = soup.find("table", class_="template-ladder")
     if not ladder_table:
         return []
+    return ladder_table.find("tbody").find_all("tr", class_="ladderRow")
+
 
+def parse_ladder_table(html_content: str) -> list[TeamRanking]:
+    """Parse the ladder table and return a list of team rankings."""
     rankings = []
 
-    for row in ladder_table.find("tbody").find_all("tr", class_="ladderRow"):
+    for row in _ladder_rows(html_content):
         # Get base team data
         position = int(row.find("td", class_="nposCol").text.strip())
         team_name = row.find("td", class_="highlightBold").text.strip()
@@ -222,13 +448,14 @@ def parse_ladder_table(html_content: str) -> list[TeamRanking]:
         # Parse movement
         move_div = row.find("div", class_="movebubble")
         if move_div:
+            move_classes = move_div.get("class", [])
             movement = (
                 "="
-                if "staticMove" in move_div.get("class", [])
+                if "staticMove" in move_classes
                 else "▲"
-                if "upMove" in move_div.get("class", [])
+                if "upMove" in move_classes
                 else "▼"
-                if "downMove" in move_div.get("class", [])
+                if "downMove" in move_classes
                 else "="
             )
 
@@ -244,7 +471,7 @@ def parse_ladder_table(html_content: str) -> list[TeamRanking]:
             movement_amount = None
 
         # Check for bonus drop
-        bonus_drop = bool(row.find("span", string=lambda x: x and "Bonus Drop" in x))
+        bonus_drop = "Bonus Drop" in row.text and bool(row.find("span", string=lambda x: x and "Bonus Drop" in x))
 
         ranking = TeamRanking(
             position=position,
@@ -264,15 +491,26 @@ def parse_ladder_table(html_content: str) -> list[TeamRanking]:
     return rankings
 
 
-def get_ladder_rankings(url: str = "https://ladder.cycleracing.club") -> list[TeamRanking]:
+def rankings_from_dicts(rankings: list[dict]) -> list[TeamRanking]:
+    """Rebuild TeamRanking objects from their cached asdict() form."""
+    rebuilt = []
+    for ranking in rankings:
+        form = [FORM_SQUARES.get((square["result"], square["is_defend"]), FORM_BLANK) for square in ranking["form"]]
+        rebuilt.append(TeamRanking(**{**ranking, "form": form}))
+    return rebuilt
+
+
+def get_ladder_rankings(url: str = BASE_URL) -> list[TeamRanking]:
     """Fetch and parse the ladder rankings from the website."""
     try:
-        with httpx.Client() as client:
-            response = client.get(url)
-            response.raise_for_status()
-            return parse_ladder_table(response.text)
+        rankings = data_http.run(
+            _aget_cached(
+                url, TTL_LADDER, lambda text: [asdict(ranking) for ranking in parse_ladder_table(text)], page="ladder"
+            )
+        )
+        return rankings_from_dicts(rankings)
     except httpx.RequestError as e:
-        print(f"Error fetching ladder rankings: {e}")
+        logger.warning(f"Error fetching ladder rankings: {e}")
         return []
 
 
@@ -0,0 +1,338 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+
+from logger_config import logger
+
+CACHE_PATH = Path(os.environ.get("LADDER_CACHE_PATH", Path(__file__).parent / ".cache" / "ladder.sqlite3"))
+# Budget of the pages, artifacts and shared values together, see _evict
+MAX_BYTES = int(os.environ.get("LADDER_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    data TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    version TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+_ARTIFACTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    value BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+# Artifacts tables created before they were part of the size budget
+_ARTIFACTS_MIGRATION = (
+    "ALTER TABLE artifacts ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0",
+    "ALTER TABLE artifacts ADD COLUMN size INTEGER NOT NULL DEFAULT 0",
+    "UPDATE artifacts SET accessed_at = created_at, size = length(value)",
+)
+
+_SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+_LEASES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+)
+"""
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+_disabled = False
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: bytes
+    data: str  # Parsed page, encoded with dumps()
+    etag: str | None
+    last_modified: str | None
+    version: str  # sha1 of the body
+    fetched_at: float
+
+    @property
+    def age(self) -> float:
+        """Seconds since the entry was last fetched or revalidated."""
+        return time.time() - self.fetched_at
+
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _connect() -> sqlite3.Connection | None:
+    """Open the cache database on first use. Caching is disabled if that fails."""
+    global _conn, _disabled
+    if _conn is None and not _disabled:
+        try:
+            CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False, isolation_level=None)
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.execute(_SCHEMA)
+            _conn.execute(_ARTIFACTS_SCHEMA)
+            if "size" not in {row[1] for row in _conn.execute("PRAGMA table_info(artifacts)")}:
+                for statement in _ARTIFACTS_MIGRATION:
+                    _conn.execute(statement)
+            _conn.execute(_SHARED_SCHEMA)
+            _conn.execute(_LEASES_SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Disk cache disabled, cannot open {CACHE_PATH}: {e}")
+            _conn = None
+            _disabled = True
+    return _conn
+
+
+def version_of(body: bytes) -> str:
+    """Content hash used to tell whether a page changed."""
+    return hashlib.sha1(body).hexdigest()
+
+
+def get(url: str) -> CacheEntry | None:
+    """Return the cached entry for a url, marking it as recently used."""
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT url, body, data, etag, last_modified, version, fetched_at FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+    return CacheEntry(*row)
+
+
+def age(url: str) -> float | None:
+    """Seconds since a url was last fetched or revalidated, None if it is not cached."""
+    with _lock:
+        conn = _connect()
+        row = conn.execute("SELECT fetched_at FROM pages WHERE url = ?", (url,)).fetchone() if conn else None
+    return None if row is None else time.time() - row[0]
+
+
+def put(url: str, body: bytes, data: str, etag: str | None = None, last_modified: str | None = None) -> None:
+    """Store a freshly fetched page and its parsed data, then evict down to MAX_BYTES."""
+    now = time.time()
+    size = len(body) + len(data)
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, body, data, etag, last_modified, version_of(body), now, now, size),
+        )
+        _evict(conn)
+
+
+def versions(prefix: str) -> dict[str, str]:
+    """Versions of the cached pages whose url starts with prefix, by url.
+
+    Reads neither the bodies nor the parsed data, so it is cheap enough to tell on
+    every call whether anything derived from those pages is out of date.
+    """
+    with _lock:
+        conn = _connect()
+        rows = (
+            conn.execute("SELECT url, version FROM pages WHERE substr(url, 1, ?) = ?", (len(prefix), prefix)).fetchall()
+            if conn
+            else []
+        )
+    return dict(rows)
+
+
+def cached_data(prefix: str) -> dict[str, str]:
+    """Parsed data, as encoded by dumps(), of the cached pages whose url starts with prefix, by url.
+
+    Entries are returned whatever their age and are not marked as recently used.
+    """
+    with _lock:
+        conn = _connect()
+        rows = (
+            conn.execute("SELECT url, data FROM pages WHERE substr(url, 1, ?) = ?", (len(prefix), prefix)).fetchall()
+            if conn
+            else []
+        )
+    return dict(rows)
+
+
+def mark_fresh(url: str) -> None:
+    """Reset the age of an entry after the upstream confirmed it is unchanged."""
+    with _lock:
+        conn = _connect()
+        if conn is not None:
+            conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+
+def invalidate(url: str) -> None:
+    """Mark an entry stale so the next read revalidates it with the upstream.
+
+    The body and validators are kept, so an unchanged page costs a 304 instead of a
+    full download and parse.
+    """
+    with _lock:
+        conn = _connect()
+        if conn is not None:
+            conn.execute("UPDATE pages SET fetched_at = 0 WHERE url = ?", (url,))
+
+
+def get_artifact(key: str, version: str) -> bytes | None:
+    """Return a stored artifact, if it was computed from the given version of its inputs."""
+    with _lock:
+        conn = _connect()
+        row = conn.execute("SELECT version, value FROM artifacts WHERE key = ?", (key,)).fetchone() if conn else None
+        if row is None or row[0] != version:
+            return None
+        conn.execute("UPDATE artifacts SET accessed_at = ? WHERE key = ?", (time.time(), key))
+    return row[1]
+
+
+def latest_artifact(key: str) -> tuple[str, bytes] | None:
+    """Return the version and value of a stored artifact, whatever version it was computed from."""
+    with _lock:
+        conn = _connect()
+        row = conn.execute("SELECT version, value FROM artifacts WHERE key = ?", (key,)).fetchone() if conn else None
+        if row is None:
+            return None
+        conn.execute("UPDATE artifacts SET accessed_at = ? WHERE key = ?", (time.time(), key))
+    return row[0], row[1]
+
+
+def put_artifact(key: str, version: str, value: bytes) -> None:
+    """Store a derived artifact, replacing any older version of it, then evict down to MAX_BYTES."""
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        if conn is not None:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (key, version, value, created_at, accessed_at, size)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, version, value, now, now, len(value)),
+            )
+            _evict(conn)
+
+
+def shared_get(key: str) -> tuple[bytes, float] | None:
+    """Return an unexpired shared value and the time it expires at."""
+    with _lock:
+        conn = _connect()
+        row = conn.execute("SELECT value, expires_at FROM shared WHERE key = ?", (key,)).fetchone() if conn else None
+    return row if row is not None and row[1] > time.time() else None
+
+
+def shared_set(key: str, value: bytes, ttl: float) -> None:
+    """Store a value shared by every process using this cache file, for ttl seconds, then evict down to MAX_BYTES."""
+    with _lock:
+        conn = _connect()
+        if conn is not None:
+            conn.execute("INSERT OR REPLACE INTO shared VALUES (?, ?, ?)", (key, value, time.time() + ttl))
+            _evict(conn)
+
+
+def shared_delete(key: str) -> None:
+    with _lock:
+        conn = _connect()
+        if conn is not None:
+            conn.execute("DELETE FROM shared WHERE key = ?", (key,))
+
+
+def acquire_lease(key: str, ttl: float) -> bool:
+    """Take a lease on a key for ttl seconds, unless another process holds one."""
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return True
+        conn.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+        return conn.execute("INSERT OR IGNORE INTO leases VALUES (?, ?)", (key, now + ttl)).rowcount == 1
+
+
+def release_lease(key: str) -> None:
+    with _lock:
+        conn = _connect()
+        if conn is not None:
+            conn.execute("DELETE FROM leases WHERE key = ?", (key,))
+
+
+def _evict(conn: sqlite3.Connection) -> None:
+    """Fit the cache in MAX_BYTES.
+
+    Expired shared values are deleted first. Shared values are otherwise only bounded by
+    their ttl, but their size counts, and pages and artifacts are deleted least recently
+    used first until the total fits.
+    """
+    conn.execute("DELETE FROM shared WHERE expires_at <= ?", (time.time(),))
+    (total,) = conn.execute(
+        "SELECT (SELECT COALESCE(SUM(size), 0) FROM pages) + (SELECT COALESCE(SUM(size), 0) FROM artifacts)"
+        " + (SELECT COALESCE(SUM(length(value)), 0) FROM shared)"
+    ).fetchone()
+    if total <= MAX_BYTES:
+        return
+    entries = conn.execute(
+        "SELECT 'pages', url, size, accessed_at FROM pages"
+        " UNION ALL SELECT 'artifacts', key, size, accessed_at FROM artifacts ORDER BY accessed_at"
+    ).fetchall()
+    for table, key, size, _ in entries:
+        conn.execute(f"DELETE FROM {table} WHERE {'url' if table == 'pages' else 'key'} = ?", (key,))
+        total -= size
+        if total <= MAX_BYTES:
+            break
+    logger.info(f"Disk cache evicted down to {total} bytes")
+
+
+def _encode(obj):
+    """Tag dates so they survive the JSON round trip."""
+    if isinstance(obj, datetime):
+        return {"__datetime__": obj.isoformat()}
+    if isinstance(obj, date):
+        return {"__date__": obj.isoformat()}
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+def _decode(obj: dict):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    return obj
+
+
+def dumps(data) -> str:
+    """Serialize parsed page data, keeping dates and datetimes."""
+    return json.dumps(data, default=_encode, separators=(",", ":"))
+
+
+def loads(data: str):
+    """Inverse of dumps."""
+    return json.loads(data, object_hook=_decode)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+from collections.abc import AsyncIterator, Coroutine, Iterator
+from typing import Any
+
+import tracing
+from lazy_imports import lazy_import
+from logger_config import logger
+
+# Loaded on the first request, page runs served from the cache never need it
+httpx = lazy_import("httpx")
+
+MAX_CONCURRENCY = 8  # Simultaneous requests to ladder.cycleracing.club
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 0.5  # First retry delay, doubled on every further attempt
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+TIMEOUT_SECONDS = 15.0
+CONNECT_TIMEOUT_SECONDS = 5.0
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_client: httpx.AsyncClient | None = None
+_semaphore: asyncio.Semaphore | None = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop that owns the shared client, starting it on first use.
+
+    The loop runs forever in a daemon thread so the pooled connections outlive a single
+    Streamlit script run, and synchronous callers from any thread can submit work to it.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ladder-http", daemon=True).start()
+    return _loop
+
+
+def run(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine on the shared HTTP event loop and block until it finishes.
+
+    Args:
+        coro: Coroutine using the shared client
+
+    Returns:
+        Any: Result of the coroutine
+
+    """
+    return asyncio.run_coroutine_threadsafe(tracing.bind(coro), _get_loop()).result()
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared client. Must be called from the shared event loop."""
+    global _client, _semaphore
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY),
+            follow_redirects=True,
+        )
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _client
+
+
+async def fetch(url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+    """GET a url through the shared connection pool.
+
+    Transport errors and throttling/server error responses are retried with
+    exponential backoff and jitter. The concurrency limit is only held while a
+    request is in flight, not while waiting to retry.
+
+    Args:
+        url (str): URL to fetch
+        headers (dict): Extra request headers
+
+    Returns:
+        httpx.Response: The successful or 304 Not Modified response
+
+    Raises:
+        httpx.RequestError: If the request still fails after all retries
+        httpx.HTTPStatusError: If the final response is an error status
+
+    """
+    client = _get_client()
+    attempt = 0
+    while True:
+        try:
+            async with _semaphore:
+                response = await client.get(url, headers=headers)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                if response.status_code != 304:  # Answer to a conditional request
+                    response.raise_for_status()
+                return response
+            logger.warning(f"Got {response.status_code} from {url}, retrying")
+        except httpx.TransportError as e:
+            if attempt == MAX_RETRIES:
+                raise
+            logger.warning(f"Request to {url} failed ({e!r}), retrying")
+        await asyncio.sleep(BACKOFF_SECONDS * 2**attempt * (1 + random.random()))
+        attempt += 1
+
+
+async def stream(url: str) -> AsyncIterator[str]:
+    """GET a url through the shared connection pool, yielding the body as it arrives.
+
+    Unlike fetch, failed requests are not retried since part of the body may already
+    have been consumed.
+
+    Args:
+        url (str): URL to fetch
+
+    Returns:
+        AsyncIterator[str]: Decoded chunks of the response body
+
+    """
+    client = _get_client()
+    async with _semaphore, client.stream("GET", url) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_text():
+            yield chunk
+
+
+async def _next_chunk(chunks: AsyncIterator[str]) -> str:
+    return await anext(chunks)
+
+
+def iter_stream(url: str) -> Iterator[str]:
+    """Synchronous version of stream for use outside the shared event loop.
+
+    The response is closed as soon as the caller stops iterating.
+    """
+    chunks = stream(url)
+    try:
+        while True:
+            try:
+                yield run(_next_chunk(chunks))
+            except StopAsyncIteration:
+                return
+    finally:
+        run(chunks.aclose())
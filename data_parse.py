@@ -0,0 +1,362 @@
+"""Single-pass HTML row extraction, a lighter alternative to a full BeautifulSoup tree.
+
+The ladder pages are large but we only read a few table rows from them. `iter_rows`
+tokenizes the page once and builds a tiny element tree for each row of interest,
+skipping everything else. Row elements implement the subset of the BeautifulSoup Tag
+API the parsers in data_api use, so the same row handling code runs on either backend.
+
+Team pages embed their data as `Ladder.<name> = <JSON>;` assignments in a script.
+`extract_assignments` reads those straight from the page text, without a DOM.
+"""
+
+import json
+import os
+import re
+from collections.abc import Callable, Iterable, Iterator
+from html import escape, unescape
+
+# Parser backends accepted by set_parser_backend
+BACKENDS = ("stream", "html.parser", "lxml")
+
+# Elements that never have content or an end tag
+VOID_ELEMENTS = frozenset(
+    "area base br col embed hr img input keygen link menuitem meta param source track wbr "
+    "basefont bgsound command frame image isindex nextid spacer".split()
+)
+
+# Elements whose content is raw text rather than markup
+RAW_TEXT_ELEMENTS = frozenset(("script", "style"))
+
+_TOKEN = re.compile(
+    r"<(/?)([a-zA-Z][^\s/>]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>"  # Start or end tag
+    r"|<!--.*?-->|<[!?][^>]*>"  # Comment, doctype or processing instruction
+    r"|[^<]+|<",  # Text
+    re.DOTALL,
+)
+_ATTR = re.compile(r"([^\s=/>]+)(?:\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+)))?")
+
+CHUNK_SIZE = 64 * 1024
+
+# Strings and brackets of a JSON value, enough to find where it ends
+_JSON_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]{}]', re.DOTALL)
+_decoder = json.JSONDecoder()
+
+_backend = os.environ.get("LADDER_PARSER", "stream")
+
+
+def get_parser_backend() -> str:
+    return _backend
+
+
+def set_parser_backend(name: str) -> None:
+    """Select how pages are parsed.
+
+    Args:
+        name (str): "stream" for the single-pass tokenizer in this module, or a
+            BeautifulSoup tree builder ("html.parser" or "lxml", which needs lxml installed)
+
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend {name!r}, expected one of {BACKENDS}")
+    _backend = name
+
+
+class Element:
+    """A parsed element, mimicking the parts of bs4.Tag used by data_api."""
+
+    __slots__ = ("name", "attrs", "contents")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.contents: list[Element | str] = []
+
+    def get(self, key: str, default=None):
+        return self.attrs.get(key, default)
+
+    def __getitem__(self, key: str):
+        return self.attrs[key]
+
+    def __iter__(self):
+        return iter(self.contents)
+
+    def descendants(self) -> Iterator["Element"]:
+        for child in self.contents:
+            if isinstance(child, Element):
+                yield child
+                yield from child.descendants()
+
+    @property
+    def text(self) -> str:
+        return "".join(self._strings())
+
+    def _strings(self) -> Iterator[str]:
+        for child in self.contents:
+            if not isinstance(child, Element):
+                yield child
+            elif child.name not in RAW_TEXT_ELEMENTS:  # Like bs4, script code is not text
+                yield from child._strings()
+
+    @property
+    def string(self) -> str | None:
+        """The only string inside this element, like bs4's Tag.string."""
+        if len(self.contents) != 1:
+            return None
+        child = self.contents[0]
+        return child.string if isinstance(child, Element) else child
+
+    def _matches(self, name: str, class_: str | None, string: Callable[[str | None], bool] | None) -> bool:
+        if self.name != name:
+            return False
+        if class_ is not None:
+            classes = self.attrs.get("class", [])
+            if class_ not in classes and " ".join(classes) != class_:
+                return False
+        return string is None or bool(string(self.string))
+
+    def find(self, name: str, class_: str | None = None, string=None) -> "Element | None":
+        for element in self.descendants():
+            if element._matches(name, class_, string):
+                return element
+        return None
+
+    def find_all(self, name: str, class_: str | None = None) -> list["Element"]:
+        return [element for element in self.descendants() if element._matches(name, class_, None)]
+
+    def __str__(self) -> str:
+        attrs = "".join(
+            f' {key}="{escape(" ".join(value) if isinstance(value, list) else value)}"'
+            for key, value in self.attrs.items()
+        )
+        if self.name in VOID_ELEMENTS:
+            return f"<{self.name}{attrs}/>"
+        inner = "".join(str(child) if isinstance(child, Element) else escape(child, quote=False) for child in self)
+        return f"<{self.name}{attrs}>{inner}</{self.name}>"
+
+
+class RowParser:
+    """Incremental parser collecting the <tr> rows of one table on a page.
+
+    Rows are searched for inside the first `container_tag` element with class
+    `container_class`, and if `section` is given, only inside the first such element
+    within the container. Completed rows are appended to `rows` as soon as their end
+    tag is seen, so the parser can be fed a page in chunks. Tokenizing stops once the
+    table is closed, the rest of the page is never looked at.
+
+    Tags are tokenized with a regular expression instead of html.parser, which does
+    a lot of per-token bookkeeping (line numbers, positions) that we have no use for.
+    """
+
+    def __init__(self, container_tag: str, container_class: str, section: str | None = None):
+        self.container_tag = container_tag
+        self.container_class = container_class
+        self.section = section
+        self.rows: list[Element] = []
+        self.done = False
+        self._open: list[str] = []  # Names of all open elements on the page
+        self._container_depth: int | None = None  # len(_open) once the container is open
+        self._scope_depth: int | None = None  # len(_open) once the element holding the rows is open
+        self._row: list[Element] = []  # Open elements of the row being built, root first
+        self._buffer = ""
+        self._raw_text_end: re.Pattern | None = None  # End tag of the raw text element we are in
+
+    def feed(self, data: str) -> None:
+        """Parse the next chunk of the page."""
+        self._buffer += data
+        self._parse(final=False)
+
+    def close(self) -> None:
+        """Parse whatever is left once the whole page has been fed."""
+        self._parse(final=True)
+
+    def _parse(self, final: bool) -> None:
+        buffer = self._buffer
+        end = len(buffer)
+        pos = 0
+        while pos < end and not self.done:
+            if self._raw_text_end is not None:
+                match = self._raw_text_end.search(buffer, pos)
+                if match is None and not final:
+                    break
+                self.handle_data(buffer[pos : match.start() if match else end])
+                if match:
+                    self.handle_endtag(match.group(1).lower())
+                self._raw_text_end = None
+                pos = match.end() if match else end
+                continue
+
+            match = _TOKEN.match(buffer, pos)
+            token = match.group()
+            name = match.group(2)
+            if not final and name is None:
+                # Text may continue (or end in half an entity) in the next chunk, and a
+                # lone "<" or comment opener is a token that was cut off
+                if match.end() == end or token == "<" or (token.startswith("<!--") and not token.endswith("-->")):
+                    break
+            if name is not None:
+                name = name.lower()
+                if match.group(1):
+                    self.handle_endtag(name)
+                else:
+                    attrs_text = match.group(3)
+                    attrs = [
+                        (key.lower(), unescape(double or single or bare))
+                        for key, double, single, bare in _ATTR.findall(attrs_text)
+                    ]
+                    if attrs_text.endswith("/"):
+                        self.handle_startendtag(name, attrs)
+                    else:
+                        self.handle_starttag(name, attrs)
+                        if name in RAW_TEXT_ELEMENTS:
+                            self._raw_text_end = re.compile(rf"</({name})\s*>", re.IGNORECASE)
+            elif token[0] != "<" or token == "<":
+                self.handle_data(unescape(token) if "&" in token else token)
+            pos = match.end()
+        self._buffer = "" if self.done else buffer[pos:]
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attrs = dict(attrs)
+        if self._row or (self._scope_depth is not None and tag == "tr"):
+            if "class" in attrs:
+                attrs["class"] = attrs["class"].split()
+            element = Element(tag, attrs)
+            if self._row:
+                self._row[-1].contents.append(element)
+            if tag not in VOID_ELEMENTS:
+                self._row.append(element)
+        elif self._container_depth is None:
+            if tag == self.container_tag and self.container_class in attrs.get("class", "").split():
+                self._container_depth = len(self._open) + 1
+                if self.section is None:
+                    self._scope_depth = self._container_depth
+        elif self._scope_depth is None and tag == self.section:
+            self._scope_depth = len(self._open) + 1
+        if tag not in VOID_ELEMENTS:
+            self._open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.done or tag not in self._open:
+            return
+        # Like BeautifulSoup, an end tag also closes every element opened after its start tag
+        while self._open.pop() != tag:
+            pass
+        if self._row:
+            root = self._row[0]
+            while self._row and self._row.pop().name != tag:
+                pass
+            if not self._row:
+                self.rows.append(root)
+        if self._scope_depth is not None and len(self._open) < self._scope_depth:
+            self.done = True
+
+    def handle_data(self, data):
+        if self._row:
+            contents = self._row[-1].contents
+            if contents and isinstance(contents[-1], str):
+                contents[-1] += data
+            else:
+                contents.append(data)
+
+
+def iter_rows(
+    chunks: str | Iterable[str], container_tag: str, container_class: str, section: str | None = None
+) -> Iterator[Element]:
+    """Yield the rows of a table on a page as soon as each one is complete, see RowParser.
+
+    Args:
+        chunks (str | Iterable[str]): Raw HTML of the page, whole or in consecutive pieces
+        container_tag (str): Tag name of the element holding the table
+        container_class (str): Class of the element holding the table
+        section (str): Optional element inside the container to restrict rows to, e.g. "tbody"
+
+    Returns:
+        Iterator[Element]: The <tr> elements in document order
+
+    """
+    if isinstance(chunks, str):
+        # Feed whole pages piecewise too, so finished rows never pile up
+        page = chunks
+        chunks = (page[i : i + CHUNK_SIZE] for i in range(0, len(page), CHUNK_SIZE))
+    parser = RowParser(container_tag, container_class, section)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.rows
+        parser.rows.clear()
+        if parser.done:
+            return
+    parser.close()
+    yield from parser.rows
+
+
+def _skip_json(text: str, pos: int, end: int) -> int:
+    """Index just after the JSON object or array starting at pos, found by bracket matching."""
+    depth = 0
+    for token in _JSON_TOKEN.finditer(text, pos, end):
+        first = token.group()[0]
+        if first in "[{":
+            depth += 1
+        elif first in "]}":
+            depth -= 1
+            if depth == 0:
+                return token.end()
+    return end
+
+
+def extract_assignments(
+    page: str | bytes, names: Iterable[str], namespace: str = "Ladder", marker: str | None = None
+) -> dict[str, object]:
+    """Decode the JSON assigned to `<namespace>.<name>` in a page's script, in one pass.
+
+    The script is the first one assigning an object or array to `<namespace>.<marker>`.
+    Its object and array assignments are scanned in order: wanted values are decoded by
+    the json module's scanner, which stops at the end of the value however many `};`
+    its strings contain, the others are skipped by bracket matching without decoding.
+
+    Args:
+        page (str | bytes): Raw HTML of the page
+        names (Iterable[str]): Names whose values to return
+        namespace (str): Object the values are assigned to
+        marker (str): Name identifying the script, the first wanted name by default
+
+    Returns:
+        Dict: Decoded value by name, for the wanted names found, first assignment wins
+
+    Raises:
+        ValueError: If the page has no such script or a wanted value is not valid JSON
+
+    """
+    if isinstance(page, bytes):
+        page = page.decode("utf-8", errors="replace")
+    names = tuple(names)
+    wanted = set(names)
+    marker = marker or names[0]
+    found = re.search(rf"\b{re.escape(namespace)}\.{re.escape(marker)}\s*=\s*[{{\[]", page)
+    if found is None:
+        raise ValueError(f"No script assigning {namespace}.{marker} in page")
+    start = page.rfind("<script", 0, found.start())
+    end = page.find("</script", found.end())
+    start, end = max(start, 0), len(page) if end == -1 else end
+
+    assignment = re.compile(rf"\b{re.escape(namespace)}\.(\w+)\s*=(?!=)\s*")
+    values: dict[str, object] = {}
+    pos = start
+    while len(values) < len(wanted):
+        match = assignment.search(page, pos, end)
+        if match is None:
+            break
+        name, pos = match.group(1), match.end()
+        if not page.startswith(("{", "["), pos):
+            continue  # Not a JSON object or array, e.g. `Ladder.team = Ladder.team || {}`
+        if name in wanted and name not in values:
+            values[name], pos = _decoder.raw_decode(page, pos)
+        else:
+            pos = _skip_json(page, pos, end)
+    return values
@@ -1,68 +1,117 @@
+import numpy as np
 import pandas as pd
-import plotly.express as px
 
+import tracing
 
-def match_power_plot(df):
-    # Define the time points (in seconds)
-    time_intervals = [5, 10, 15, 30, 60, 120, 300, 600, 1200, 1800]
-    differance = []
-    teams = df["Team"].unique()
-    for interval in time_intervals:
-        row = {"Seconds": interval}
-        for comp in ["w", "wkg"]:
-            home_avg = df[(df["Team"] == teams[0]) & (df[f"w{interval}"] > 0)][f"{comp}{interval}"].mean()
-            away_avg = df[(df["Team"] == teams[1]) & (df[f"w{interval}"] > 0)][f"{comp}{interval}"].mean()
-            home_max = df[(df["Team"] == teams[0]) & (df[f"w{interval}"] > 0)][f"{comp}{interval}"].max()
-            away_max = df[(df["Team"] == teams[1]) & (df[f"w{interval}"] > 0)][f"{comp}{interval}"].max()
-            home_min = df[(df["Team"] == teams[0]) & (df[f"w{interval}"] > 0)][f"{comp}{interval}"].min()
-            away_min = df[(df["Team"] == teams[1]) & (df[f"w{interval}"] > 0)][f"{comp}{interval}"].min()
-            row.update(
-                {
-                    f"{comp}_Avg": home_avg - away_avg,
-                    f"{comp}_Max": home_max - away_max,
-                    f"{comp}_Min": home_min - away_min,
-                }
-            )
-
-        differance.append(row)
-    df_differance = pd.DataFrame(differance)
-
-    w_fig = px.line(
-        df_differance, x="Seconds", y=["w_Min", "w_Avg", "w_Max"], title="Power Differance Curve", line_shape="spline"
-    )
-    w_fig.update_layout(yaxis_title="Home - Away")
-
-    watt_y_range = max(
-        abs(df_differance[["w_Min", "w_Avg", "w_Max"]].values.min()),
-        abs(df_differance[["w_Min", "w_Avg", "w_Max"]].values.max()),
-    )
-
-    w_fig.update_layout(
-        yaxis_title=f"{teams[0]} - {teams[1]}",
-        yaxis=dict(
-            range=[-watt_y_range, watt_y_range]  # This centers 0
-        ),
-        height=600,
-    )
-
-    wkg_fig = px.line(
-        df_differance,
-        x="Seconds",
-        y=["wkg_Min", "wkg_Avg", "wkg_Max"],
-        title="WKG Differance Curve",
-        line_shape="spline",
-    )
-    wkg_y_range = max(
-        abs(df_differance[["wkg_Min", "wkg_Avg", "wkg_Max"]].values.min()),
-        abs(df_differance[["wkg_Min", "wkg_Avg", "wkg_Max"]].values.max()),
-    )
-
-    wkg_fig.update_layout(
-        yaxis_title=f"{teams[0]} - {teams[1]}",
-        yaxis=dict(
-            range=[-wkg_y_range, wkg_y_range]  # This centers 0
-        ),
-        height=600,
-    )
+# Define the time points (in seconds)
+TIME_INTERVALS = [5, 10, 15, 30, 60, 120, 300, 600, 1200, 1800]
+W_COLUMNS = [f"w{interval}" for interval in TIME_INTERVALS]
+WKG_COLUMNS = [f"wkg{interval}" for interval in TIME_INTERVALS]
+# Column label used in df_differance for each statistic
+STAT_LABELS = {"mean": "Avg", "max": "Max", "min": "Min"}
+LINE_COLORS = ["#636efa", "#EF553B", "#00cc96"]  # First colors of Plotly's default template
+
+
+def team_power_stats(df: pd.DataFrame, stats=("mean", "max", "min"), top_n: int | None = None) -> pd.DataFrame:
+    """Compute per team statistics of every w*/wkg* interval column in one grouped pass.
+
+    A rider only counts for an interval if they have a positive watts value for it, for
+    both the w and the wkg column of that interval.
+
+    Args:
+        df (pd.DataFrame): Roster frame with a Team column, see data_stats.compare_rosters
+        stats: Any pandas groupby aggregations, e.g. "mean", "max", "min", "median"
+        top_n (int): Also compute the mean of each team's best top_n riders, as stat "top{top_n}"
+
+    Returns:
+        pd.DataFrame: One row per team in order of appearance, (column, stat) columns
+
+    """
+    values = df[W_COLUMNS + WKG_COLUMNS].astype("Float64").to_numpy(dtype="float64", na_value=np.nan)
+    has_watts = values[:, : len(W_COLUMNS)] > 0
+    values[~np.hstack([has_watts, has_watts])] = np.nan
+    frame = pd.DataFrame(values, columns=W_COLUMNS + WKG_COLUMNS)
+    teams = df["Team"].to_numpy()
+
+    grouped = frame.groupby(teams, sort=False)
+    team_stats = grouped.agg(list(stats))
+    if top_n:
+        is_top = grouped.rank(method="first", ascending=False) <= top_n
+        top_mean = frame.where(is_top).groupby(teams, sort=False).mean()
+        top_mean.columns = pd.MultiIndex.from_product([top_mean.columns, [f"top{top_n}"]])
+        team_stats = pd.concat([team_stats, top_mean], axis=1)[frame.columns]
+    return team_stats
+
+
+def power_differance(team_stats: pd.DataFrame, home: str, away: str) -> pd.DataFrame:
+    """Difference between two teams' interval statistics, one row per interval.
 
+    Args:
+        team_stats (pd.DataFrame): Output of team_power_stats
+        home (str): Team the differences are relative to
+        away (str): Team subtracted from home
+
+    Returns:
+        pd.DataFrame: Seconds plus a {w,wkg}_{stat} column for every stat in team_stats
+
+    """
+    diff = (team_stats.loc[home] - team_stats.loc[away]).unstack()
+    df_differance = pd.DataFrame({"Seconds": TIME_INTERVALS})
+    for comp, columns in (("w", W_COLUMNS), ("wkg", WKG_COLUMNS)):
+        for stat in team_stats.columns.unique(level=1):
+            values = diff.loc[columns, stat].to_numpy()
+            # Watts are whole numbers, keep their extremes integer as the rosters have them
+            if comp == "w" and stat in ("max", "min") and np.isfinite(values).all() and (values % 1 == 0).all():
+                values = values.astype("int64")
+            df_differance[f"{comp}_{STAT_LABELS.get(stat, stat)}"] = values
+    return df_differance
+
+
+def match_power_plot(df, team_stats: pd.DataFrame | None = None):
+    teams = df["Team"].unique()
+    with tracing.span("plots.stats"):
+        if team_stats is None:
+            team_stats = team_power_stats(df, stats=("mean", "max", "min"))
+        df_differance = power_differance(team_stats, teams[0], teams[1])
+    with tracing.span("plots.figures"):
+        w_fig, wkg_fig = _differance_figures(df_differance, teams[0], teams[1])
     return df_differance, w_fig, wkg_fig
+
+
+def line_figure(df: pd.DataFrame, x: str, y: list[str], title: str, yaxis_title: str, y_range: list[float]) -> dict:
+    """Plotly figure JSON of spline lines, as plotly.express.line draws them, for st.plotly_chart.
+
+    Written directly rather than through plotly.express, which takes long to import and
+    to build a figure, and without its template, which Streamlit's theme replaces anyway.
+    """
+    traces = [
+        {
+            "type": "scatter",
+            "mode": "lines",
+            "name": column,
+            "legendgroup": column,
+            "x": df[x].tolist(),
+            "y": df[column].tolist(),
+            "line": {"color": color, "dash": "solid", "shape": "spline"},
+            "hovertemplate": f"variable={column}<br>{x}=%{{x}}<br>value=%{{y}}<extra></extra>",
+        }
+        for column, color in zip(y, LINE_COLORS)
+    ]
+    layout = {
+        "title": {"text": title},
+        "xaxis": {"title": {"text": x}},
+        "yaxis": {"title": {"text": yaxis_title}, "range": y_range},
+        "legend": {"title": {"text": "variable"}, "tracegroupgap": 0},
+        "height": 600,
+    }
+    return {"data": traces, "layout": layout}
+
+
+def _differance_figures(df_differance: pd.DataFrame, home: str, away: str) -> tuple[dict, dict]:
+    figures = []
+    for comp, title in (("w", "Power Differance Curve"), ("wkg", "WKG Differance Curve")):
+        columns = [f"{comp}_Min", f"{comp}_Avg", f"{comp}_Max"]
+        # Symmetric range so 0 is centered
+        y_range = float(np.abs(df_differance[columns].to_numpy(dtype="float64")).max())
+        figures.append(line_figure(df_differance, "Seconds", columns, title, f"{home} - {away}", [-y_range, y_range]))
+    return tuple(figures)
@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 
+import tracing
 from logger_config import logger
 
 COL_BASE = ["Team", "Name", "ZP", "ZR", "FTP"]
@@ -7,48 +9,79 @@ COL_WATTS = ["w5", "w10", "w15", "w30", "w60", "w120", "w300", "w600", "w1200",
 COL_WKG = ["wkg5", "wkg10", "wkg15", "wkg30", "wkg60", "wkg120", "wkg300", "wkg600", "wkg1200", "wkg1800"]
 COL_OTHER = ["wkg", "watts", "wtotal", "wkgtotal"]
 
+ZP_PROFILE_URL = "https://zwiftpower.com/profile.php?z="
+ZR_PROFILE_URL = "https://www.zwiftracing.app/riders/"
 
-def compare_rosters(home_team: dict, away_team: dict) -> pd.DataFrame:
-    home_roster = home_team.get("roster")
-    away_roster = away_team.get("roster")
-    if home_roster:
-        riders = []
-        for rider in home_roster:
-            rider_data = {
-                "Team": home_team["thisteam"]["name"],
-                "Name": rider["ZPName"],
-                "ZP": f"https://zwiftpower.com/profile.php?z={rider['id']}",
-                "ZR": f"https://www.zwiftracing.app/riders/{rider['id']}",
-                "FTP": rider["zwiftData"]["ftp"],
-            }
-            rider_data.update({k: v for k, v in rider["powerMax"]["ninety"].items()})
-            riders.append(rider_data)
-        df_home_roster = pd.DataFrame(riders)
-        df_home_roster[COL_WATTS + COL_WKG] = df_home_roster[COL_WATTS + COL_WKG].replace(0, pd.NA)
-
-    else:
-        logger.warning("No home roster found")
-        df_home_roster = pd.DataFrame()
-    if away_roster:
-        riders = []
-        for rider in away_roster:
-            rider_data = {
-                "Team": away_team["thisteam"]["name"],
-                "Name": rider["ZPName"],
-                "ZP": f"https://zwiftpower.com/profile.php?z={rider['id']}",
-                "ZR": f"https://www.zwiftracing.app/riders/{rider['id']}",
-                "FTP": rider["zwiftData"]["ftp"],
-            }
-            rider_data.update({k: v for k, v in rider["powerMax"]["ninety"].items()})
-            riders.append(rider_data)
-        df_away_roster = pd.DataFrame(riders)
-        logger.info("If the power value is zero, set it to None")
-        df_away_roster[COL_WATTS + COL_WKG] = df_away_roster[COL_WATTS + COL_WKG].replace(0, pd.NA)
-    else:
-        logger.warning("No away roster found")
-        df_away_roster = pd.DataFrame()
-
-    df_rosters = pd.concat([df_home_roster, df_away_roster], axis=0)
+
+def _empty_rosters() -> pd.DataFrame:
+    """Roster frame without riders, with the dtypes of a built one."""
+    columns = {column: pd.array([], dtype=object) for column in COL_BASE}
+    columns.update({column: pd.array([], dtype="Float64") for column in ["FTP", *COL_WATTS, *COL_WKG, *COL_OTHER]})
+    return pd.DataFrame(columns)
+
+
+@tracing.traced("rosters.build")
+def build_rosters(teams: list[dict]) -> pd.DataFrame:
+    """Build one roster frame for any number of teams straight from their roster JSON.
+
+    Values are written into one preallocated column per field instead of a dict per
+    rider, so the cost grows linearly with the number of riders. Power values are
+    nullable Float64 columns, zero w*/wkg* values (no data for the interval) are NA.
+    FTP is a Float64 column too, as some riders' FTP is fractional.
+
+    Args:
+        teams (list[dict]): Team data as returned by data_api.get_squad
+
+    Returns:
+        pd.DataFrame: One row per rider, sorted by team and FTP descending
+
+    """
+    total = sum(len(team.get("roster") or []) for team in teams)
+    team_names = np.empty(total, dtype=object)
+    names = np.empty(total, dtype=object)
+    ids = np.empty(total, dtype=object)
+    ftps = [None] * total
+    power: dict[str, np.ndarray] = {}
+
+    i = 0
+    for team in teams:
+        roster = team.get("roster")
+        if not roster:
+            logger.warning(f"No roster found for team {team.get('id')}")
+            continue
+        team_names[i : i + len(roster)] = team["thisteam"]["name"]
+        for rider in roster:
+            names[i] = rider["ZPName"]
+            ids[i] = str(rider["id"])
+            ftps[i] = rider["zwiftData"]["ftp"]
+            for key, value in rider["powerMax"]["ninety"].items():
+                column = power.get(key)
+                if column is None:
+                    column = power[key] = np.full(total, np.nan)
+                column[i] = value
+            i += 1
+    if not total:
+        return _empty_rosters()
+
+    columns = {
+        "Team": team_names,
+        "Name": names,
+        "ZP": ZP_PROFILE_URL + ids,
+        "ZR": ZR_PROFILE_URL + ids,
+        "FTP": pd.array(ftps, dtype="Float64"),
+    }
+    for key, values in power.items():
+        missing = np.isnan(values)
+        if key in COL_WATTS or key in COL_WKG:
+            # If the power value is zero, set it to None
+            missing |= values == 0
+        columns[key] = pd.arrays.FloatingArray(values, missing)
+
+    df_rosters = pd.DataFrame(columns)
     df_rosters.sort_values(by=["Team", "FTP"], ascending=False, inplace=True)
     df_rosters.reset_index(drop=True, inplace=True)
     return df_rosters
+
+
+def compare_rosters(home_team: dict, away_team: dict) -> pd.DataFrame:
+    return build_rosters([home_team, away_team])
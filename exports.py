@@ -0,0 +1,147 @@
+import gzip
+import io
+import json
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import pandas as pd
+import streamlit as st
+
+import data_cache
+import tracing
+from data_api import datetime_handler
+from lru import LRU
+
+MAX_MEMORY_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class Format:
+    label: str
+    extension: str
+    mime: str
+
+
+FORMATS = {
+    "json": Format("JSON", ".json", "application/json"),
+    "json.gz": Format("JSON (gzip)", ".json.gz", "application/gzip"),
+    "csv": Format("CSV", ".csv", "text/csv"),
+    "csv.gz": Format("CSV (gzip)", ".csv.gz", "application/gzip"),
+    "parquet": Format("Parquet", ".parquet", "application/vnd.apache.parquet"),
+    "arrow": Format("Arrow IPC", ".arrow", "application/vnd.apache.arrow.file"),
+}
+# Formats offered for nested data like squads, and for data frames
+RECORD_FORMATS = ("json", "json.gz")
+TABLE_FORMATS = ("csv", "csv.gz", "json", "json.gz", "parquet", "arrow")
+
+# (key, format): (version, payload), bounded by the size of the payloads
+_memory: LRU[tuple[str, str], tuple[str, bytes]] = LRU(MAX_MEMORY_BYTES, weigh=lambda entry: len(entry[1]))
+
+
+def encode(data: Any, fmt: str) -> bytes:
+    """Serialize a data frame or JSON compatible data in one of FORMATS.
+
+    Args:
+        data (Any): Data frame, or dicts and lists as returned by data_api
+        fmt (str): Key of FORMATS. Parquet and Arrow need a data frame.
+
+    Returns:
+        bytes: The file content
+
+    """
+    if fmt.endswith(".gz"):
+        # mtime=0 so the same data always gives the same bytes
+        return gzip.compress(encode(data, fmt.removesuffix(".gz")), compresslevel=6, mtime=0)
+    if fmt == "json":
+        if isinstance(data, pd.DataFrame):
+            return data.to_json(orient="records", date_format="iso").encode()
+        return json.dumps(data, default=datetime_handler, separators=(",", ":")).encode()
+    if not isinstance(data, pd.DataFrame):
+        raise ValueError(f"{FORMATS[fmt].label} export needs a data frame")
+    if fmt == "csv":
+        return data.to_csv(index=False).encode()
+    buffer = io.BytesIO()
+    if fmt == "parquet":
+        data.to_parquet(buffer, index=False, compression="zstd")
+    elif fmt == "arrow":
+        data.reset_index(drop=True).to_feather(buffer, compression="zstd")
+    else:
+        raise ValueError(f"Unknown export format {fmt}")
+    return buffer.getvalue()
+
+
+def get_export(key: str, version: str, fmt: str, build: Callable[[], Any]) -> bytes:
+    """Return an export, serializing it only once per version of its data.
+
+    Exports are kept in memory up to MAX_MEMORY_BYTES and in the disk cache, so every
+    session and replica reuses them until the data they come from changes.
+
+    Args:
+        key (str): What is exported, e.g. "squad:1234"
+        version (str): Version of the data, e.g. the squad's version hash
+        fmt (str): Key of FORMATS
+        build (Callable): Returns the data to export, only called when it is not cached
+
+    Returns:
+        bytes: The file content
+
+    """
+    cached = _memory.get((key, fmt))
+    if cached and cached[0] == version:
+        tracing.count("export", format=fmt, result="memory")
+        return cached[1]
+
+    artifact_key = f"export:{key}:{fmt}"
+    payload = data_cache.get_artifact(artifact_key, version)
+    if payload is not None:
+        tracing.count("export", format=fmt, result="disk")
+    else:
+        tracing.count("export", format=fmt, result="built")
+        with tracing.span("export.build", format=fmt):
+            payload = encode(build(), fmt)
+        data_cache.put_artifact(artifact_key, version, payload)
+
+    _memory.put((key, fmt), (version, payload))
+    return payload
+
+
+@st.fragment
+def download(
+    label: str,
+    key: str,
+    version: str,
+    build: Callable[[], Any],
+    file_name: str,
+    formats: tuple[str, ...] = RECORD_FORMATS,
+):
+    """Format picker and download button that only serializes the data once asked to.
+
+    Streamlit needs a download button's data up front, so the export is built when the
+    user presses Prepare, and only this fragment reruns for it. Later page runs fetch the
+    prepared export from the cache, until the data's version changes.
+
+    Args:
+        label (str): What is downloaded, e.g. "Team A data"
+        key (str): Export key, see get_export
+        version (str): Version of the data
+        build (Callable): Returns the data to export
+        file_name (str): File name without extension
+        formats (Tuple[str, ...]): Keys of FORMATS to offer, the first one is the default
+
+    """
+    col1, col2 = st.columns([3, 2], vertical_alignment="bottom")
+    fmt = col1.selectbox(label, formats, format_func=lambda f: FORMATS[f].label, key=f"export_format:{key}")
+    prepared = f"export_prepared:{key}:{fmt}"
+    if st.session_state.get(prepared) != version:
+        if not col2.button("Prepare", key=f"export_prepare:{key}:{fmt}"):
+            return
+        st.session_state[prepared] = version
+    payload = get_export(key, version, fmt, build)
+    col2.download_button(
+        label=f"⬇️ {len(payload) / 1024:,.0f} KB",
+        data=payload,
+        file_name=file_name + FORMATS[fmt].extension,
+        mime=FORMATS[fmt].mime,
+        key=f"export_download:{key}:{fmt}",
+    )
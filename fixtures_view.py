@@ -0,0 +1,97 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import shared_cache
+from data_api import TTL_SUMMARY, format_timedeltas, get_ladder
+from logger_config import logger
+
+ALL_TEAMS = "All Teams"
+LADDER_KEY = "ladder:summary"
+LADDER_MAX_STALE = 24 * 60 * 60  # Serve the last good fixtures this long while the upstream fails
+
+
+def load_ladder() -> dict:
+    logger.info("Loading ladder data")
+    data = get_ladder()
+    if not data.get("fixtures"):  # Currently only using the ficture data, get_ladder returns {} on errors
+        raise ValueError("Invalid ladder fixture data structure")
+    return data
+
+
+def cache_ladder() -> tuple[dict, float]:
+    """Caches ladder fixtures data in the cache shared by all sessions and replicas.
+
+    Stale data is served at once and refreshed in the background, see
+    shared_cache.SharedCache.get_stale_while_revalidate.
+
+    Returns:
+        Tuple[Dict, float]: Ladder fixture data and its age in seconds
+    Raises:
+        RuntimeError: If there is no cached data and it cannot be retrieved
+
+    """
+    try:
+        return shared_cache.get_cache().get_stale_while_revalidate(
+            LADDER_KEY, load_ladder, ttl=TTL_SUMMARY, max_stale=LADDER_MAX_STALE
+        )
+    except Exception as e:
+        logger.error(f"Failed to load ladder data: {e}")
+        raise RuntimeError("Failed to load ladder data") from e
+
+
+@dataclass
+class FixturesView:
+    """Fixture table prepared once per fixtures payload, for the fixtures page.
+
+    The frame is sorted by start time and has its Link column built. team_rows maps
+    each team name to the positions of its fixtures in the frame, so showing one team
+    is an index lookup. Only the countdown depends on the current time, see at().
+    """
+
+    frame: pd.DataFrame
+    team_rows: dict[str, np.ndarray]
+    teams: list[str]  # ALL_TEAMS then every team name, sorted
+
+    @classmethod
+    def build(cls, fixtures: list[dict]) -> "FixturesView":
+        df = pd.DataFrame(fixtures)
+        df.sort_values(by=["date_time"], inplace=True, kind="stable")
+        link = np.char.add(
+            np.char.add("/Match?home_id=", df["Home id"].to_numpy(dtype=str)),
+            np.char.add("&away_id=", df["Away id"].to_numpy(dtype=str)),
+        )
+        df["Link"] = link.astype(object)
+
+        team_rows: dict[str, np.ndarray] = {}
+        positions = pd.Series(np.arange(len(df)))
+        for column in ("Home Name", "Away Name"):
+            for team, rows in positions.groupby(df[column].to_numpy()).indices.items():
+                team_rows[team] = np.union1d(team_rows[team], rows) if team in team_rows else rows
+        return cls(df, team_rows, [ALL_TEAMS, *sorted(team_rows)])
+
+    def at(self, now: datetime, team: str = ALL_TEAMS) -> pd.DataFrame:
+        """Fixtures of a team, or all of them, with their countdown from now."""
+        if team == ALL_TEAMS:
+            df = self.frame.copy()
+        else:
+            df = self.frame.iloc[self.team_rows.get(team, np.empty(0, dtype=np.intp))].copy()
+        df["time_delta"] = df["date_time"] - now
+        df["Go Time"] = format_timedeltas(df["time_delta"].to_numpy() / np.timedelta64(1, "s"))
+        return df
+
+
+_cached: tuple[list[dict], FixturesView] | None = None
+_lock = threading.Lock()
+
+
+def get_view(fixtures: list[dict]) -> FixturesView:
+    """View of a fixtures payload, built again only when the payload object changes."""
+    global _cached
+    with _lock:
+        if _cached is None or _cached[0] is not fixtures:
+            _cached = (fixtures, FixturesView.build(fixtures))
+        return _cached[1]
@@ -1,13 +1,19 @@
-import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
-import pandas as pd
 import streamlit as st
 
-from data_api import datetime_handler, format_timedelta, get_ladder
+import data_cache
+import exports
+import fixtures_view
+import prefetch
+import shared_cache
+import tracing
+from data_api import SUMMARY_URL, format_timedelta
+from fixtures_view import LADDER_KEY, LADDER_MAX_STALE, cache_ladder, load_ladder
 from logger_config import logger
 
 st.set_page_config(page_title="Ladder Fixtures", layout="wide", initial_sidebar_state="collapsed")
+prefetch.start()
 
 FIXTURE_COLUMNS = [
     # "Date",
@@ -25,44 +31,9 @@ FIXTURE_COLUMNS = [
 ]
 
 
-@st.cache_data
-def cache_ladder() -> dict:
-    """Caches ladder fixtures data using Streamlit's caching mechanism.
-
-    Returns:
-        Dict: Ladder fixture data
-    Raises:
-        RuntimeError: If ladder data cannot be retrieved
-
-    """
-    try:
-        logger.info("Loading ladder data")
-        data = get_ladder()
-        if not data["fixtures"]:  # Currently only using the ficture data
-            raise ValueError("Invalid ladder fixture data structure")
-        return data
-    except Exception as e:
-        logger.error(f"Failed to load ladder data: {e}")
-        raise RuntimeError("Failed to load ladder data") from e
-
-
-ladder = cache_ladder()
-
-df_ladder = pd.DataFrame(ladder["fixtures"])
-team_list = sorted(list(df_ladder["Home Name"].unique()) + list(df_ladder["Away Name"].unique()))
-team_list.insert(0, "All Teams")
-
-df_ladder["Link"] = df_ladder.apply(lambda row: f"/Match?home_id={row['Home id']}&away_id={row['Away id']}", axis=1)
-now = datetime.now()
-df_ladder["time_delta"] = df_ladder["date_time"] - now
-df_ladder["Go Time"] = df_ladder["time_delta"].apply(format_timedelta)
-df_ladder.sort_values(by=["date_time"], inplace=True)
-
-
-def filter_dataframe(df, team: str = "All Teams"):
-    """Filter dataframe based on selected team"""
-    if team != "All Teams":
-        df = df[(df["Home Name"] == team) | (df["Away Name"] == team)]
+def filter_dataframe(view: fixtures_view.FixturesView, team: str = fixtures_view.ALL_TEAMS):
+    """Show the fixtures of the selected team"""
+    df = view.at(datetime.now(), team)
     st.dataframe(
         df[FIXTURE_COLUMNS],
         column_config={
@@ -72,24 +43,44 @@ def filter_dataframe(df, team: str = "All Teams"):
     )
 
 
-selected_team = st.selectbox(
-    "Select team", team_list, index=0, on_change=filter_dataframe, args=(df_ladder, "team_filter"), key="team_filter"
-)
-
-filter_dataframe(df_ladder, selected_team)
-
-
-col1, col2 = st.columns(2)
-
-with col1:
-    if st.button("🔄 Reload data"):
-        st.cache_data.clear()
-        st.success("Data reloaded!")
-        st.rerun()
-with col2:
-    st.download_button(
-        label="⬇️Download JSON",
-        data=json.dumps(ladder, default=datetime_handler, indent=2),
-        file_name="ladder.json",
-        mime="application/json",
-    )
+with tracing.request("fixtures") as trace:
+    with tracing.span("fixtures.load"):
+        ladder, ladder_age = cache_ladder()
+    refreshing = " - refreshing in the background" if shared_cache.get_cache().refreshing(LADDER_KEY) else ""
+    # Age of the page as last fetched from the upstream, not of the copy in the shared cache
+    fetched_age = data_cache.age(SUMMARY_URL)
+    fetched_age = ladder_age if fetched_age is None else fetched_age
+    st.caption(f"Fixtures fetched {format_timedelta(timedelta(seconds=fetched_age))} ago{refreshing}")
+
+    with tracing.span("fixtures.frame"):
+        view = fixtures_view.get_view(ladder["fixtures"])
+
+    selected_team = st.selectbox("Select team", view.teams, index=0, key="team_filter")
+
+    with tracing.span("fixtures.table"):
+        filter_dataframe(view, selected_team)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        if st.button("🔄 Reload data"):
+            data_cache.invalidate(SUMMARY_URL)
+            try:
+                shared_cache.get_cache().refresh(LADDER_KEY, load_ladder, max_stale=LADDER_MAX_STALE)
+            except Exception as e:
+                logger.error(f"Failed to reload ladder data: {e}")
+                st.error("Could not reload the fixtures, showing the last loaded data")
+                st.stop()
+            st.success("Data reloaded!")
+            st.rerun()
+    with col2:
+        exports.download(
+            "Download fixtures",
+            LADDER_KEY,
+            # Hash the content of fixtures cached before they carried a version
+            ladder.get("version") or data_cache.version_of(data_cache.dumps(ladder).encode()),
+            lambda: ladder,
+            "ladder",
+        )
+
+tracing.show_timings(trace)
@@ -0,0 +1,242 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import data_cache
+from data_api import TeamRanking
+from ladder_table import decode_form, encode_form
+from logger_config import logger
+
+HISTORY_PATH = Path(
+    os.environ.get("LADDER_HISTORY_PATH", Path(__file__).parent / ".cache" / "ladder_history.jsonl")
+)
+KEYFRAME_EVERY = 50  # Store the full ladder every this many snapshots, bounding replay cost
+LEASE_SECONDS = 10  # Longest a writer holds the file, and waits for another writer before giving up
+POLL_SECONDS = 0.05
+
+# Stored per team, besides its id
+FIELDS = (
+    "position",
+    "team_name",
+    "club_name",
+    "region_id",
+    "form",
+    "movement",
+    "movement_amount",
+    "is_zombie",
+    "has_bonus_drop",
+)
+
+
+def _row(ranking: TeamRanking) -> tuple:
+    return (
+        ranking.position,
+        ranking.team_name,
+        ranking.club_name,
+        ranking.region_id,
+        encode_form(ranking.form),
+        ranking.movement,
+        ranking.movement_amount,
+        ranking.is_zombie,
+        ranking.has_bonus_drop,
+    )
+
+
+def _ranking(team_id: str, row: tuple) -> TeamRanking:
+    values = dict(zip(FIELDS, row))
+    values["form"] = decode_form(values["form"])
+    return TeamRanking(team_id=team_id, **values)
+
+
+class LadderHistory:
+    """Append-only history of ladder snapshots, storing only what changed.
+
+    Each line of the file is one snapshot: its time, the ids of teams that left the
+    ladder and, column by column, the full state of every team whose state changed
+    since the previous snapshot. Every KEYFRAME_EVERY snapshots all teams are written,
+    so rebuilding the ladder at any time replays at most that many lines.
+
+    An in-memory index of line offsets by time and by team is built when the file is
+    opened, so queries only read the lines they need. Several processes may share the
+    file: writers take a data_cache lease on it, and every instance reads the lines
+    appended by the others before recording or answering a query.
+    """
+
+    def __init__(self, path: Path = HISTORY_PATH):
+        self.path = Path(path)
+        self._times: list[float] = []
+        self._offsets: list[int] = []
+        self._keyframes: list[int] = []  # Positions in _offsets of full snapshots
+        self._team_offsets: dict[str, list[int]] = defaultdict(list)
+        self._state: dict[str, tuple] = {}  # Latest state of every team on the ladder
+        self._lock = threading.Lock()
+        self._end = 0  # Offset up to which the file is indexed
+        self._catch_up()
+
+    def _index(self, snapshot: dict, offset: int) -> None:
+        if snapshot["full"]:
+            self._keyframes.append(len(self._offsets))
+        self._times.append(snapshot["t"])
+        self._offsets.append(offset)
+        self._replay(self._state, snapshot)
+        for team_id in snapshot["removed"] + snapshot["cols"]["team_id"]:
+            self._team_offsets[team_id].append(offset)
+
+    def _catch_up(self) -> None:
+        """Index the lines appended since the last call, by this or another process."""
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as f:
+            f.seek(self._end)
+            for line in f:
+                # A line still being written by another process is read on a later call
+                if not line.endswith(b"\n"):
+                    break
+                self._index(json.loads(line), self._end)
+                self._end += len(line)
+
+    @staticmethod
+    def _replay(state: dict[str, tuple], snapshot: dict) -> None:
+        if snapshot["full"]:
+            state.clear()
+        for team_id in snapshot["removed"]:
+            state.pop(team_id, None)
+        cols = snapshot["cols"]
+        for i, team_id in enumerate(cols["team_id"]):
+            state[team_id] = tuple(cols[field][i] for field in FIELDS)
+
+    def record(self, rankings: list[TeamRanking], at: datetime | None = None) -> bool:
+        """Append a snapshot of the ladder, if anything changed since the last one.
+
+        Args:
+            rankings (list[TeamRanking]): Current ladder, e.g. from data_api.get_ladder_rankings
+            at (datetime): Time of the snapshot, now by default
+
+        Returns:
+            bool: Whether a snapshot was written
+
+        """
+        at = at or datetime.now()
+        rows = {ranking.team_id: _row(ranking) for ranking in rankings}
+        with self._lock:
+            if self._times and at.timestamp() <= self._times[-1]:
+                raise ValueError("Snapshots must be recorded in time order")
+            if not self._acquire():
+                logger.warning(f"Ladder snapshot skipped, another process kept {self.path} locked")
+                return False
+            try:
+                # Diff against the ladder as last written by any process, not only this one
+                self._catch_up()
+                if self._times and at.timestamp() <= self._times[-1]:
+                    return False  # Another process recorded a newer snapshot meanwhile
+                removed = [team_id for team_id in self._state if team_id not in rows]
+                changed = {k: v for k, v in rows.items() if self._state.get(k) != v}
+                if not changed and not removed:
+                    return False
+                full = not self._keyframes or len(self._offsets) - self._keyframes[-1] >= KEYFRAME_EVERY
+                if full:
+                    changed = rows
+
+                cols = {"team_id": list(changed)}
+                for i, field in enumerate(FIELDS):
+                    cols[field] = [row[i] for row in changed.values()]
+                snapshot = {"t": at.timestamp(), "full": full, "removed": removed, "cols": cols}
+                line = (json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("ab") as f:
+                    f.write(line)
+                self._catch_up()
+            finally:
+                data_cache.release_lease(self._lease_key)
+        return True
+
+    @property
+    def _lease_key(self) -> str:
+        return f"ladder_history:{self.path.resolve()}"
+
+    def _acquire(self) -> bool:
+        """Take the writer lease on the file, waiting up to LEASE_SECONDS for another writer."""
+        deadline = time.monotonic() + LEASE_SECONDS
+        while not data_cache.acquire_lease(self._lease_key, LEASE_SECONDS):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_SECONDS)
+        return True
+
+    def _read(self, offsets: list[int]) -> list[dict]:
+        with self.path.open("rb") as f:
+            snapshots = []
+            for offset in offsets:
+                f.seek(offset)
+                snapshots.append(json.loads(f.readline()))
+        return snapshots
+
+    def ladder_at(self, at: datetime) -> list[TeamRanking]:
+        """Return the ladder as it was at a given time, ordered by position.
+
+        Args:
+            at (datetime): Point in time to rebuild the ladder for
+
+        Returns:
+            List[TeamRanking]: The ladder, empty if no snapshot is that old
+
+        """
+        with self._lock:
+            self._catch_up()
+            last = bisect.bisect_right(self._times, at.timestamp()) - 1
+            if last < 0:
+                return []
+            first = self._keyframes[bisect.bisect_right(self._keyframes, last) - 1]
+            offsets = self._offsets[first : last + 1]
+        state: dict[str, tuple] = {}
+        for snapshot in self._read(offsets):
+            self._replay(state, snapshot)
+        return sorted((_ranking(team_id, row) for team_id, row in state.items()), key=lambda r: r.position)
+
+    def team_history(self, team_id: str) -> list[tuple[datetime, TeamRanking | None]]:
+        """Return every change of a team's ladder state, oldest first.
+
+        Args:
+            team_id (str): Team to look up
+
+        Returns:
+            List[Tuple[datetime, TeamRanking | None]]: Time and new state of each change,
+                None while the team was off the ladder
+
+        """
+        with self._lock:
+            self._catch_up()
+            offsets = list(self._team_offsets.get(team_id, []))
+        history = []
+        previous = None
+        for snapshot in self._read(offsets):
+            cols = snapshot["cols"]
+            if team_id in snapshot["removed"]:
+                ranking = None
+            else:
+                i = cols["team_id"].index(team_id)
+                ranking = _ranking(team_id, tuple(cols[field][i] for field in FIELDS))
+            # Keyframes repeat unchanged teams, only report real changes
+            if ranking != previous:
+                history.append((datetime.fromtimestamp(snapshot["t"]), ranking))
+            previous = ranking
+        return history
+
+
+_history: LadderHistory | None = None
+_history_lock = threading.Lock()
+
+
+def get_history() -> LadderHistory:
+    """Process wide history, opened on first use."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = LadderHistory()
+    return _history
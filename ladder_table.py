@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from data_api import FORM_BLANK, FORM_SQUARES, FormResult, TeamRanking
+
+# Form squares as one character each, lower case marks a defend
+FORM_CODES = {
+    FORM_BLANK: ".",
+    **{square: result.lower() if is_defend else result for (result, is_defend), square in FORM_SQUARES.items()},
+}
+FORM_RESULTS = {code: square for square, code in FORM_CODES.items()}
+
+# Form squares as small ints in LadderTable.form, FORM_PAD fills rows with a shorter form
+FORM_PAD = 0
+FORM_INTS = {square: i for i, square in enumerate(FORM_CODES, start=1)}
+FORM_BY_INT = [None, *FORM_CODES]
+
+MOVEMENTS = ("=", "▲", "▼")
+_MOVEMENT_INTS = {movement: i for i, movement in enumerate(MOVEMENTS)}
+
+_STR_COLUMNS = ("team_id", "team_name", "club_name", "region_id")
+
+
+def encode_form(form: list[FormResult]) -> str:
+    """Form squares as a string, one character per square."""
+    return "".join(FORM_CODES.get(square, ".") for square in form)
+
+
+def decode_form(codes: str) -> list[FormResult]:
+    """Inverse of encode_form, returning the shared FormResult instances."""
+    return [FORM_RESULTS[code] for code in codes]
+
+
+class LadderTable:
+    """Columnar ladder: one numpy array per TeamRanking field instead of an object per team.
+
+    Positions and movement amounts are int32, movements int8 indexes into MOVEMENTS and
+    the form an (n_teams, max_form) uint8 array of FORM_INTS codes, padded with FORM_PAD.
+    Strings are shared with the rankings the table is built from, everything else
+    takes a few bytes per team, and boolean masks select teams without a Python loop.
+    """
+
+    __slots__ = (
+        "position",
+        "team_id",
+        "team_name",
+        "club_name",
+        "region_id",
+        "form",
+        "movement",
+        "movement_amount",
+        "has_movement_amount",
+        "is_zombie",
+        "has_bonus_drop",
+    )
+
+    def __init__(self, **columns: np.ndarray):
+        for name in self.__slots__:
+            setattr(self, name, columns[name])
+
+    @classmethod
+    def from_rankings(cls, rankings: list[TeamRanking]) -> "LadderTable":
+        n = len(rankings)
+        width = max((len(ranking.form) for ranking in rankings), default=0)
+        form = np.full((n, width), FORM_PAD, dtype=np.uint8)
+        for i, ranking in enumerate(rankings):
+            form[i, : len(ranking.form)] = [FORM_INTS.get(square, FORM_INTS[FORM_BLANK]) for square in ranking.form]
+        amounts = [ranking.movement_amount for ranking in rankings]
+        return cls(
+            position=np.fromiter((ranking.position for ranking in rankings), dtype=np.int32, count=n),
+            **{
+                name: np.array([getattr(ranking, name) for ranking in rankings], dtype=object)
+                for name in _STR_COLUMNS
+            },
+            form=form,
+            movement=np.fromiter((_MOVEMENT_INTS.get(r.movement, 0) for r in rankings), dtype=np.int8, count=n),
+            movement_amount=np.fromiter((amount or 0 for amount in amounts), dtype=np.int32, count=n),
+            has_movement_amount=np.fromiter((amount is not None for amount in amounts), dtype=bool, count=n),
+            is_zombie=np.fromiter((ranking.is_zombie for ranking in rankings), dtype=bool, count=n),
+            has_bonus_drop=np.fromiter((ranking.has_bonus_drop for ranking in rankings), dtype=bool, count=n),
+        )
+
+    def __len__(self) -> int:
+        return len(self.position)
+
+    def __getitem__(self, index) -> "LadderTable | TeamRanking":
+        """One team as a TeamRanking for an int, a new table for a slice, mask or index array."""
+        if isinstance(index, (int, np.integer)):
+            return self.ranking(int(index))
+        return LadderTable(**{name: getattr(self, name)[index] for name in self.__slots__})
+
+    def ranking(self, i: int) -> TeamRanking:
+        return TeamRanking(
+            position=int(self.position[i]),
+            team_name=self.team_name[i],
+            club_name=self.club_name[i],
+            team_id=self.team_id[i],
+            region_id=self.region_id[i],
+            form=[FORM_BY_INT[code] for code in self.form[i] if code != FORM_PAD],
+            movement=MOVEMENTS[self.movement[i]],
+            movement_amount=int(self.movement_amount[i]) if self.has_movement_amount[i] else None,
+            is_zombie=bool(self.is_zombie[i]),
+            has_bonus_drop=bool(self.has_bonus_drop[i]),
+        )
+
+    def to_rankings(self) -> list[TeamRanking]:
+        return [self.ranking(i) for i in range(len(self))]
+
+    def count_form(self, square: FormResult) -> np.ndarray:
+        """Number of times each team has a given form square, e.g. FORM_SQUARES["W", False]."""
+        return (self.form == FORM_INTS[square]).sum(axis=1)
+
+    def wins(self) -> np.ndarray:
+        """Wins in the form of each team, defends included."""
+        return self.count_form(FORM_SQUARES["W", False]) + self.count_form(FORM_SQUARES["W", True])
+
+    def losses(self) -> np.ndarray:
+        """Losses in the form of each team, defends included."""
+        return self.count_form(FORM_SQUARES["L", False]) + self.count_form(FORM_SQUARES["L", True])
+
+    def form_strings(self) -> np.ndarray:
+        """Form of each team as an encode_form string."""
+        chars = np.array(["", *FORM_CODES.values()])
+        return np.array(["".join(row) for row in chars[self.form]], dtype=object)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Frame of the ladder sharing the table's numeric and boolean arrays, without copies.
+
+        Movement is a categorical over MOVEMENTS, movement amounts a nullable Int32 column
+        and the form one encode_form string per team.
+        """
+        columns = {
+            "position": self.position,
+            **{name: getattr(self, name) for name in _STR_COLUMNS},
+            "form": self.form_strings(),
+            "movement": pd.Categorical.from_codes(self.movement, categories=MOVEMENTS),
+            "movement_amount": pd.arrays.IntegerArray(self.movement_amount, ~self.has_movement_amount),
+            "is_zombie": self.is_zombie,
+            "has_bonus_drop": self.has_bonus_drop,
+        }
+        return pd.DataFrame(columns, copy=False)
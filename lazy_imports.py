@@ -0,0 +1,29 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return a module that is only loaded when one of its attributes is first used.
+
+    For heavy modules that many runs never touch, like httpx when every page is served
+    from the cache. Modules only used inside a function are simpler to import there.
+
+    Args:
+        name (str): Module name, e.g. "httpx"
+
+    Returns:
+        ModuleType: The module, loaded already if something imported it before
+
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,282 @@
+import io
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import data_api
+import data_cache
+import tracing
+from data_stats import COL_WATTS, COL_WKG
+from logger_config import logger
+
+COLUMNS = COL_WATTS + COL_WKG
+TOP_N = 4  # Riders whose power makes a team's profile, a ladder race has four per team
+# Edge, as mean relative power difference, that gives a team a 73% (1 / (1 + e^-1)) chance to win
+EDGE_SCALE = 0.05
+ROWS_PER_BLOCK = 1024
+
+
+@dataclass
+class League:
+    """Power profiles of every team and the predicted strength of every pairing.
+
+    profiles holds, per team and COLUMNS interval, the mean of its TOP_N best riders
+    for that interval. strength[i, j] is the mean relative difference between the
+    profiles of team i and team j over the intervals both have data for, so it is
+    positive when i is the stronger team and strength[j, i] == -strength[i, j].
+    """
+
+    team_ids: np.ndarray
+    names: np.ndarray
+    riders: np.ndarray  # Riders with power data, per team
+    profiles: np.ndarray  # float64 (teams, COLUMNS), NaN without data
+    strength: np.ndarray  # float32 (teams, teams), NaN when either team has no data
+
+    def __len__(self) -> int:
+        return len(self.team_ids)
+
+    def index(self, team_id) -> int:
+        return int(np.flatnonzero(self.team_ids == str(team_id))[0])
+
+    def profile_frame(self) -> pd.DataFrame:
+        """One row per team with its profile, strongest on average first."""
+        df = pd.DataFrame(self.profiles, columns=COLUMNS)
+        df.insert(0, "Team", self.names)
+        df.insert(0, "Team id", self.team_ids)
+        df.insert(2, "Riders", self.riders)
+        df.insert(3, "Strength", np.nanmean(self.strength, axis=1) if len(self) else [])
+        return df.sort_values("Strength", ascending=False, ignore_index=True)
+
+    def predict(self, home_id, away_id) -> tuple[float, float]:
+        """Strength edge of the home team over the away team and its win probability."""
+        edge = float(self.strength[self.index(home_id), self.index(away_id)])
+        return edge, win_probability(edge)
+
+    def matchups(self, closest: bool = True, limit: int | None = 100) -> pd.DataFrame:
+        """Every pairing once, the most even (or the most lopsided) first.
+
+        Args:
+            closest (bool): Sort by how even the pairing is, else by how lopsided
+            limit (int): Number of pairings to return, None for all of them
+
+        Returns:
+            pd.DataFrame: Stronger and weaker team of each pairing, the edge and win probability
+
+        """
+        rows, cols = np.triu_indices(len(self), k=1)
+        edges = self.strength[rows, cols]
+        known = ~np.isnan(edges)
+        rows, cols, edges = rows[known], cols[known], edges[known]
+        order = np.argsort(np.abs(edges), kind="stable")
+        if not closest:
+            order = order[::-1]
+        order = order[:limit]
+        # Put the stronger team first
+        flip = edges[order] < 0
+        first = np.where(flip, cols[order], rows[order])
+        second = np.where(flip, rows[order], cols[order])
+        edge = np.abs(edges[order])
+        return pd.DataFrame(
+            {
+                "Team id": self.team_ids[first],
+                "Team": self.names[first],
+                "Opponent id": self.team_ids[second],
+                "Opponent": self.names[second],
+                "Edge": edge,
+                "Win probability": win_probability(edge),
+            }
+        )
+
+    def predict_fixtures(self, fixtures: list[dict]) -> pd.DataFrame:
+        """Predicted edge of the home team for fixtures as returned by data_api.get_ladder."""
+        position = {team_id: i for i, team_id in enumerate(self.team_ids)}
+        df = pd.DataFrame(fixtures)
+        home = df["Home id"].astype(str).map(position)
+        away = df["Away id"].astype(str).map(position)
+        known = (home.notna() & away.notna()).to_numpy()
+        edge = np.full(len(df), np.nan)
+        edge[known] = self.strength[home[known].astype(int), away[known].astype(int)]
+        df["Edge"] = edge
+        df["Win probability"] = win_probability(edge)
+        return df
+
+
+def win_probability(edge):
+    """Chance the team with the given strength edge wins, a logistic curve over EDGE_SCALE."""
+    return 1 / (1 + np.exp(-np.asarray(edge) / EDGE_SCALE))
+
+
+def power_matrix(squads: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    """Power of every rider of every team in one padded array.
+
+    Args:
+        squads (list[dict]): Team data as returned by data_api.get_squad
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: float64 (teams, riders, COLUMNS) power, NaN for
+            padding and missing values, and the number of riders with data per team
+
+    """
+    size = max((len(squad.get("roster") or []) for squad in squads), default=0)
+    power = np.full((len(squads), size, len(COLUMNS)), np.nan)
+    for t, squad in enumerate(squads):
+        for r, rider in enumerate(squad.get("roster") or []):
+            ninety = rider["powerMax"]["ninety"]
+            power[t, r] = [ninety.get(column) or np.nan for column in COLUMNS]
+    mask_missing(power)
+    riders = (~np.isnan(power)).any(axis=2).sum(axis=1)
+    return power, riders
+
+
+def mask_missing(power: np.ndarray) -> None:
+    """Set to NaN, in place, the values of an array of COLUMNS whose watts are not positive.
+
+    A rider only counts for an interval with a positive watts value, as in data_plots.team_power_stats.
+    """
+    has_watts = power[..., : len(COL_WATTS)] > 0
+    power[~np.concatenate([has_watts, has_watts], axis=-1)] = np.nan
+
+
+def team_profiles(power: np.ndarray, top_n: int = TOP_N) -> np.ndarray:
+    """Mean of each team's top_n riders for every interval, NaN where no rider has data.
+
+    Args:
+        power (np.ndarray): Output of power_matrix
+        top_n (int): Riders counted per team and interval
+
+    Returns:
+        np.ndarray: float64 (teams, COLUMNS)
+
+    """
+    # Sorting the negated values puts the best first and NaN last
+    best = -np.sort(-power, axis=1)[:, :top_n]
+    counts = (~np.isnan(best)).sum(axis=1)
+    totals = np.nansum(best, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, totals / counts, np.nan)
+
+
+def strength_rows(profiles: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """Rows start:stop of the strength matrix, see League.
+
+    The mean of log(profile_i / profile_j) over the intervals both teams have data for
+    is a difference of masked sums, so a whole block takes three matrix products.
+    """
+    known = ~np.isnan(profiles)
+    logs = np.where(known, np.log(np.where(known, profiles, 1)), 0)
+    mask = known.astype(np.float64)
+    block_logs, block_mask = logs[start:stop], mask[start:stop]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        strength = (block_logs @ mask.T - block_mask @ logs.T) / (block_mask @ mask.T)
+    return strength.astype(np.float32)
+
+
+def strength_matrix(profiles: np.ndarray) -> np.ndarray:
+    """Strength of every team against every other, float32 (teams, teams).
+
+    Rows are computed in blocks of ROWS_PER_BLOCK to bound the float64 intermediates.
+    """
+    n = len(profiles)
+    strength = np.empty((n, n), dtype=np.float32)
+    for start in range(0, n, ROWS_PER_BLOCK):
+        strength[start : start + ROWS_PER_BLOCK] = strength_rows(profiles, start, min(start + ROWS_PER_BLOCK, n))
+    return strength
+
+
+def build_league(squads: list[dict], top_n: int = TOP_N) -> League:
+    """Profiles and strength matrix of the given teams.
+
+    Args:
+        squads (list[dict]): Team data as returned by data_api.get_squad
+        top_n (int): Riders counted per team and interval
+
+    Returns:
+        League: Profiles and strengths, teams in the order given
+
+    """
+    with tracing.span("league.profiles"):
+        power, riders = power_matrix(squads)
+        profiles = team_profiles(power, top_n)
+    with tracing.span("league.strength"):
+        strength = strength_matrix(profiles)
+    return League(
+        team_ids=np.array([str(squad["id"]) for squad in squads], dtype=object),
+        names=np.array([squad["thisteam"].get("name", "") for squad in squads], dtype=object),
+        riders=riders,
+        profiles=profiles,
+        strength=strength,
+    )
+
+
+def cached_squads_state() -> str:
+    """Version of the team pages in the disk cache, changes when any of them is fetched again, changed or evicted."""
+    pages = data_cache.versions(data_api.SQUADS_URL)
+    return data_cache.version_of(" ".join(f"{url}:{version}" for url, version in sorted(pages.items())).encode())
+
+
+def cached_squads() -> tuple[list[dict], str]:
+    """Squads of every team whose page is in the disk cache and a version that changes when any of them does.
+
+    Nothing is fetched: the squads are kept fresh by the rate limited prefetcher (see prefetch)
+    and by the pages that show them, whatever their age.
+
+    Returns:
+        Tuple[List[dict], str]: Squads by ascending team id and their combined version
+
+    """
+    squads = [data_cache.loads(data) for data in data_cache.cached_data(data_api.SQUADS_URL).values()]
+    squads.sort(key=lambda squad: int(squad["id"]))
+    version = data_cache.version_of(" ".join(f"{squad['id']}:{squad.get('version')}" for squad in squads).encode())
+    return squads, version
+
+
+_league: tuple[str, str, League] | None = None  # (cached pages state, squads version, league)
+_lock = threading.Lock()  # Held while the league is rebuilt
+
+
+def get_league() -> League:
+    """League of every team whose squad is in the disk cache, rebuilt only when one of them changed.
+
+    Nothing is fetched, see cached_squads. As with rider_index.get_rider_index, the league in
+    memory is checked on every call against the versions of the cached team pages, and the
+    sessions that find it rebuilding keep being served the one they had.
+
+    Returns:
+        League: Teams by ascending team id
+
+    """
+    global _league
+    state = cached_squads_state()
+    current = _league
+    if current is not None and current[0] == state:
+        tracing.count("league", result="memory")
+        return current[2]
+    if not _lock.acquire(blocking=current is None):
+        tracing.count("league", result="stale")
+        return current[2]
+    try:
+        if _league is not None and _league[0] == state:
+            tracing.count("league", result="memory")
+            return _league[2]
+
+        squads, version = cached_squads()
+        if _league is not None and _league[1] == version:
+            tracing.count("league", result="memory")
+            league = _league[2]
+        elif (stored := data_cache.get_artifact("league", version)) is not None:
+            tracing.count("league", result="disk")
+            with np.load(io.BytesIO(stored), allow_pickle=True) as arrays:
+                league = League(**{name: arrays[name] for name in arrays.files})
+        else:
+            tracing.count("league", result="computed")
+            logger.info(f"Building league of {len(squads)} teams")
+            league = build_league(squads)
+            buffer = io.BytesIO()
+            np.savez(buffer, **vars(league))
+            data_cache.put_artifact("league", version, buffer.getvalue())
+        _league = (state, version, league)
+        return league
+    finally:
+        _lock.release()
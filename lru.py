@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRU(Generic[K, V]):
+    """Thread safe in-memory cache dropping its least recently used entries past a bound.
+
+    The bound is on the number of entries, or on their total weight when a weigh function
+    is given, e.g. the size of byte payloads. The entry put last is always kept, even when
+    it alone weighs more than the bound.
+    """
+
+    def __init__(self, max_size: int, weigh: Callable[[V], int] | None = None):
+        self.max_size = max_size
+        self.weigh = weigh
+        self.size = 0  # Number or total weight of the entries
+        self._entries: OrderedDict[K, tuple[V, int]] = OrderedDict()  # key: (value, weight)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """Return the value of a key, marking it as recently used, None when missing."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: K, value: V) -> None:
+        """Store a value, then drop the least recently used entries until the cache fits."""
+        weight = self.weigh(value) if self.weigh else 1
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            self.size += weight - (previous[1] if previous else 0)
+            self._entries[key] = (value, weight)
+            while self.size > self.max_size and len(self._entries) > 1:
+                self.size -= self._entries.popitem(last=False)[1][1]
+
+    def pop(self, key: K) -> V | None:
+        """Remove a key, returning its value, None when missing."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self.size -= entry[1]
+            return entry[0]
@@ -0,0 +1,84 @@
+import pickle
+from dataclasses import dataclass
+
+import pandas as pd
+
+import data_cache
+import squad_store
+import tracing
+from data_plots import match_power_plot
+from data_stats import COL_BASE, COL_OTHER, COL_WATTS, COL_WKG
+from logger_config import logger
+from lru import LRU
+from squad_store import squad_version
+from table_style import gradient_css
+
+MAX_MEMORY_ENTRIES = 64
+ARTIFACT_REVISION = 3  # Bump when Comparison changes, so comparisons pickled before are not loaded
+
+
+@dataclass
+class Comparison:
+    """Everything the Match page shows for a pair of squads."""
+
+    rosters: pd.DataFrame
+    differance: pd.DataFrame
+    w_fig: dict  # Plotly figure JSON
+    wkg_fig: dict
+    rosters_css: pd.DataFrame  # Cell styles of the tables, see table_style.gradient_css
+    differance_css: pd.DataFrame
+
+
+_memory: LRU[str, tuple[str, Comparison]] = LRU(MAX_MEMORY_ENTRIES)  # key: (version, comparison)
+
+
+def comparison_key(home_team: dict, away_team: dict) -> tuple[str, str]:
+    """Key of a matchup and the version of the squad data it is computed from."""
+    return f"match:{home_team['id']}:{away_team['id']}", f"{squad_version(home_team)}:{squad_version(away_team)}"
+
+
+def build_comparison(home_team: dict, away_team: dict) -> Comparison:
+    # Only the riders that changed since the squads were last seen are processed again
+    df_rosters, team_stats = squad_store.get_store().compare(home_team, away_team)
+    df_rosters = df_rosters[COL_BASE + COL_WATTS + COL_WKG + COL_OTHER]
+    df_differance, w_fig, wkg_fig = match_power_plot(df_rosters, team_stats)
+    with tracing.span("comparison.styles"):
+        rosters_css = gradient_css(df_rosters, COL_WATTS + COL_WKG)
+        differance_css = gradient_css(df_differance, [c for c in df_differance.columns if c != "Seconds"])
+    return Comparison(df_rosters, df_differance, w_fig, wkg_fig, rosters_css, differance_css)
+
+
+def get_comparison(home_team: dict, away_team: dict) -> Comparison:
+    """Return the comparison of two squads, computing it only once per squad version.
+
+    Results are kept in memory for the most popular matchups and in the disk cache for
+    the rest. A stored comparison is replaced as soon as either squad's version changes.
+
+    Args:
+        home_team (dict): Home squad as returned by data_api.get_squad
+        away_team (dict): Away squad as returned by data_api.get_squad
+
+    Returns:
+        Comparison: Roster frame, differance table, their cell styles and figures
+
+    """
+    key, version = comparison_key(home_team, away_team)
+    cached = _memory.get(key)
+    if cached and cached[0] == version:
+        tracing.count("comparison", result="memory")
+        return cached[1]
+
+    artifact_version = f"{version}:r{ARTIFACT_REVISION}"
+    stored = data_cache.get_artifact(key, artifact_version)
+    if stored is not None:
+        tracing.count("comparison", result="disk")
+        comparison = pickle.loads(stored)
+    else:
+        tracing.count("comparison", result="computed")
+        logger.info(f"Computing comparison {key}")
+        with tracing.span("comparison.build"):
+            comparison = build_comparison(home_team, away_team)
+        data_cache.put_artifact(key, artifact_version, pickle.dumps(comparison))
+
+    _memory.put(key, (version, comparison))
+    return comparison
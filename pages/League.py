@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import streamlit as st
+
+import fixtures_view
+import league
+import prefetch
+import tracing
+
+st.set_page_config(page_title="League", layout="wide", initial_sidebar_state="collapsed")
+prefetch.start()
+
+FIXTURE_COLUMNS = ["date_time", "Home Name", "Away Name", "Route", "Edge", "Win probability"]
+
+
+with tracing.request("league") as trace:
+    with tracing.span("league.load"), st.spinner("Comparing the cached teams ..."):
+        teams = league.get_league()
+    st.caption(
+        f"{len(teams):,} teams whose squads are cached, more are added as their fixtures come up"
+        " or their pages are opened. The edge is the home team's, or the first team's, mean relative"
+        f" power advantage over the best {league.TOP_N} riders of each team."
+    )
+
+    fixtures_tab, matchups_tab, profiles_tab = st.tabs(["Upcoming fixtures", "Matchups", "Team profiles"])
+    with fixtures_tab:
+        try:
+            with tracing.span("league.fixtures"):
+                ladder, _ = fixtures_view.cache_ladder()
+            now = datetime.now()
+            fixtures = [fixture for fixture in ladder["fixtures"] if fixture["date_time"] >= now]
+        except RuntimeError:
+            fixtures = None
+            st.warning("Could not load the fixtures, try again later")
+        if fixtures:
+            df_fixtures = teams.predict_fixtures(fixtures).sort_values("date_time", kind="stable")
+            st.dataframe(df_fixtures[FIXTURE_COLUMNS], hide_index=True, use_container_width=True)
+        elif fixtures is not None:
+            st.info("No upcoming fixtures")
+    with matchups_tab:
+        col1, col2 = st.columns(2)
+        lopsided = col1.toggle("Most lopsided first")
+        limit = col2.number_input("Pairings", min_value=1, max_value=1000, value=100)
+        with tracing.span("league.matchups"):
+            df_matchups = teams.matchups(closest=not lopsided, limit=limit)
+        st.dataframe(df_matchups, hide_index=True, use_container_width=True)
+    with profiles_tab:
+        st.dataframe(teams.profile_frame(), hide_index=True, use_container_width=True)
+
+tracing.show_timings(trace)
@@ -0,0 +1,80 @@
+from dataclasses import asdict
+from datetime import timedelta
+
+import streamlit as st
+
+import prefetch
+import rankings_view
+import shared_cache
+import tracing
+from data_api import TTL_LADDER, format_timedelta, get_ladder_rankings
+from logger_config import logger
+
+st.set_page_config(page_title="Rankings", layout="wide", initial_sidebar_state="collapsed")
+prefetch.start()
+
+RANKINGS_KEY = "ladder:rankings"
+RANKINGS_MAX_STALE = 24 * 60 * 60  # Serve the last good rankings this long while the upstream fails
+PAGE_SIZES = (25, 50, 100, 250)
+
+
+def load_rankings() -> list[dict]:
+    logger.info("Loading ladder rankings")
+    rankings = get_ladder_rankings()
+    if not rankings:
+        raise ValueError("No ladder rankings")
+    return [asdict(ranking) for ranking in rankings]
+
+
+def cache_rankings() -> tuple[list[dict], float]:
+    """Caches the ladder rankings in the cache shared by all sessions and replicas.
+
+    Returns:
+        Tuple[List[dict], float]: Rankings as dicts and their age in seconds
+    Raises:
+        RuntimeError: If there are no cached rankings and they cannot be retrieved
+
+    """
+    try:
+        return shared_cache.get_cache().get_stale_while_revalidate(
+            RANKINGS_KEY, load_rankings, ttl=TTL_LADDER, max_stale=RANKINGS_MAX_STALE
+        )
+    except Exception as e:
+        logger.error(f"Failed to load ladder rankings: {e}")
+        raise RuntimeError("Failed to load ladder rankings") from e
+
+
+with tracing.request("rankings") as trace:
+    with tracing.span("rankings.load"):
+        rankings, rankings_age = cache_rankings()
+    with tracing.span("rankings.view"):
+        view = rankings_view.get_view(rankings)
+    st.caption(f"{len(view):,} teams, rankings loaded {format_timedelta(timedelta(seconds=rankings_age))} ago")
+
+    columns = st.columns(len(rankings_view.FACETS))
+    filters = {
+        facet: column.selectbox(facet, view.options(facet), key=f"rankings_{facet}")
+        for facet, column in zip(rankings_view.FACETS, columns)
+    }
+    col1, col2, col3, col4 = st.columns(4)
+    sort = col1.selectbox("Sort by", rankings_view.SORTS, key="rankings_sort")
+    descending = col2.toggle("Descending", key="rankings_descending")
+    size = col3.selectbox("Teams per page", PAGE_SIZES, index=1, key="rankings_size")
+
+    with tracing.span("rankings.select"):
+        rows = view.select(filters, sort, descending)
+    pages = max(1, -(-len(rows) // size))
+    # The page number resets to 1 when the number of pages changes
+    page = col4.number_input(f"Page of {pages:,}", min_value=1, max_value=pages, value=1)
+    start = (page - 1) * size
+
+    with tracing.span("rankings.table"):
+        st.caption(f"Teams {min(start + 1, len(rows)):,}-{min(start + size, len(rows)):,} of {len(rows):,}")
+        st.dataframe(
+            view.frame(rows[start : start + size]),
+            hide_index=True,
+            use_container_width=True,
+            column_config={"Link": st.column_config.LinkColumn("Team page", display_text="Open")},
+        )
+
+tracing.show_timings(trace)
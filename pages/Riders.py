@@ -0,0 +1,54 @@
+import pandas as pd
+import streamlit as st
+
+import prefetch
+import rider_index
+import tracing
+from data_stats import ZP_PROFILE_URL, ZR_PROFILE_URL
+from league import COLUMNS
+
+st.set_page_config(page_title="Riders", layout="wide", initial_sidebar_state="collapsed")
+prefetch.start()
+
+
+def rider_table(df: pd.DataFrame):
+    ids = df["Rider id"].astype(str)
+    df.insert(2, "ZP", ZP_PROFILE_URL + ids)
+    df.insert(3, "ZR", ZR_PROFILE_URL + ids)
+    st.dataframe(
+        df,
+        hide_index=True,
+        column_config={
+            "ZP": st.column_config.LinkColumn("ZP Profile", display_text="Open"),
+            "ZR": st.column_config.LinkColumn("ZR Profile", display_text="Open"),
+        },
+    )
+
+
+with tracing.request("riders") as trace:
+    with tracing.span("riders.index"), st.spinner("Indexing the riders of the cached teams ..."):
+        index = rider_index.get_rider_index()
+    st.caption(
+        f"{len(index):,} riders in the {len(index.team_ids):,} teams whose squads are cached,"
+        " more are added as their fixtures come up or their pages are opened"
+    )
+
+    find_tab, top_tab, teams_tab = st.tabs(["Find rider", "Top riders", "Teams above"])
+    with find_tab:
+        query = st.text_input("Rider name", placeholder="e.g. john sm")
+        if query:
+            rider_table(index.search(query, limit=50))
+    with top_tab:
+        col1, col2 = st.columns(2)
+        column = col1.selectbox("Interval", COLUMNS, index=COLUMNS.index("wkg300"), key="top_column")
+        n = col2.number_input("Riders", min_value=1, max_value=500, value=20)
+        rider_table(index.top(column, n))
+    with teams_tab:
+        col1, col2 = st.columns(2)
+        column = col1.selectbox("Interval", COLUMNS, index=COLUMNS.index("wkg300"), key="above_column")
+        value = col2.number_input("Above", min_value=0.0, value=5.0 if column.startswith("wkg") else 400.0)
+        df_teams = index.teams_above(column, value)
+        st.caption(f"{len(df_teams):,} teams have a rider above {value:g} {column}")
+        st.dataframe(df_teams, hide_index=True)
+
+tracing.show_timings(trace)
@@ -0,0 +1,34 @@
+import pandas as pd
+import streamlit as st
+
+import prefetch
+import tracing
+
+st.set_page_config(page_title="Status", layout="wide", initial_sidebar_state="collapsed")
+
+prefetcher = prefetch.start()
+if prefetcher is None:
+    st.info("Squad prefetching is disabled (LADDER_PREFETCH=0)")
+else:
+    status = prefetcher.status()
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Teams scheduled", status["teams"])
+    col2.metric("Due for refresh", status["due"])
+    col3.metric("Refreshed", status["refreshed"])
+    col4.metric("Failed", status["failed"])
+    col5.metric("Cycles", status["cycles"])
+    st.caption(
+        f"Running: {status['running']} - last cycle: {status['last_cycle'] or 'never'}"
+        + (f" - last error: {status['last_error']}" if status["last_error"] else "")
+    )
+    st.dataframe(pd.DataFrame(status["schedule"]), use_container_width=True, hide_index=True)
+    if st.button("🔄 Refresh"):
+        st.rerun()
+
+st.subheader("Metrics")
+metrics = tracing.snapshot()
+col1, col2 = st.columns(2)
+col1.dataframe(pd.DataFrame(metrics["counters"]), use_container_width=True, hide_index=True)
+col2.dataframe(pd.DataFrame(metrics["spans"]), use_container_width=True, hide_index=True)
+st.caption(f"Also written to {tracing.METRICS_PATH} after page runs, at most every {tracing.METRICS_SECONDS:g} s")
+st.download_button("⬇️Download OpenMetrics", data=tracing.export(), file_name="metrics.txt", mime="text/plain")
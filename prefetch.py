@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import data_api
+import data_cache
+import ladder_history
+from logger_config import logger
+
+# How old a team's cached squad may get, by the time left until its next race.
+# Teams racing later than the last bound only need to stay within the squad TTL.
+FRESHNESS = [
+    (timedelta(hours=1), 10 * 60),
+    (timedelta(hours=6), 30 * 60),
+]
+DEFAULT_FRESHNESS = data_api.TTL_SQUAD * 3 // 4
+RACE_GRACE = timedelta(hours=1)  # Keep a team warm this long after its race started
+REQUESTS_PER_SECOND = float(os.environ.get("LADDER_PREFETCH_RPS", "1"))
+POLL_SECONDS = 30
+STARTUP_DELAY_SECONDS = 10  # Let a fresh replica render its first page before prefetching competes with it
+SNAPSHOT_SECONDS = data_api.TTL_LADDER  # How often the ladder rankings are recorded
+
+
+def max_age(time_to_race: timedelta) -> float:
+    """Seconds a team's squad may be cached for, the sooner it races the fresher."""
+    for bound, seconds in FRESHNESS:
+        if time_to_race < bound:
+            return seconds
+    return DEFAULT_FRESHNESS
+
+
+class SquadPrefetcher:
+    """Background thread keeping the squads of upcoming fixtures in the disk cache.
+
+    Every cycle the fixture list is read, each team is given a freshness target from
+    its next race time, and the squads that are older than that are refreshed, soonest
+    race first. Upstream requests are spaced out to at most `requests_per_second`.
+    Every SNAPSHOT_SECONDS the ladder rankings are also recorded in ladder_history.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = REQUESTS_PER_SECOND,
+        poll_seconds: float = POLL_SECONDS,
+        startup_delay: float = STARTUP_DELAY_SECONDS,
+    ):
+        self.min_interval = 1 / requests_per_second
+        self.poll_seconds = poll_seconds
+        self.startup_delay = startup_delay
+        self.schedule: list[dict] = []
+        self.counters = {"cycles": 0, "refreshed": 0, "failed": 0, "snapshots": 0}
+        self.last_cycle: datetime | None = None
+        self.last_snapshot: datetime | None = None
+        self.last_error: str | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_request = 0.0
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="squad-prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        if self._stop.wait(self.startup_delay):
+            return
+        while not self._stop.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                logger.error(f"Prefetch cycle failed: {e}")
+                self.last_error = str(e)
+            self._stop.wait(self.poll_seconds)
+
+    def plan(self, fixtures: list[dict], now: datetime) -> list[dict]:
+        """Next race and cache state of every team in upcoming fixtures, soonest race first.
+
+        Args:
+            fixtures (list[dict]): Fixtures as returned by data_api.get_ladder
+            now (datetime): Current time, in the fixtures' time zone
+
+        Returns:
+            List[Dict]: team_id, next_race, age, max_age and due (needs a refresh) per team
+
+        """
+        next_race = {}
+        for fixture in fixtures:
+            if fixture["date_time"] < now - RACE_GRACE:
+                continue
+            for team_id in (fixture["Home id"], fixture["Away id"]):
+                if team_id and (team_id not in next_race or fixture["date_time"] < next_race[team_id]):
+                    next_race[team_id] = fixture["date_time"]
+
+        schedule = []
+        for team_id, race_time in sorted(next_race.items(), key=lambda item: item[1]):
+            age = data_cache.age(data_api.squad_url(team_id))
+            limit = max_age(race_time - now)
+            schedule.append(
+                {
+                    "team_id": team_id,
+                    "next_race": race_time,
+                    "age": age,
+                    "max_age": limit,
+                    "due": age is None or age >= limit,
+                }
+            )
+        return schedule
+
+    def run_cycle(self) -> None:
+        """Refresh every squad that is due, soonest race first."""
+        self.schedule = self.plan(data_api.get_ladder().get("fixtures", []), datetime.now())
+        for item in self.schedule:
+            if self._stop.is_set():
+                break
+            if not item["due"]:
+                continue
+            self._throttle()
+            try:
+                data_api.get_squad(item["team_id"], max_age=0)
+                self.counters["refreshed"] += 1
+                item["age"] = 0.0
+                item["due"] = False
+            except Exception as e:
+                logger.warning(f"Prefetch of squad {item['team_id']} failed: {e}")
+                self.counters["failed"] += 1
+                self.last_error = str(e)
+        self.counters["cycles"] += 1
+        self.last_cycle = datetime.now()
+        if self.last_snapshot is None or self.last_cycle - self.last_snapshot >= timedelta(seconds=SNAPSHOT_SECONDS):
+            self.snapshot_ladder()
+
+    def snapshot_ladder(self) -> None:
+        """Record the current ladder rankings in the ladder history."""
+        self._throttle()
+        rankings = data_api.get_ladder_rankings()
+        if rankings and ladder_history.get_history().record(rankings):
+            self.counters["snapshots"] += 1
+        self.last_snapshot = datetime.now()
+
+    def _throttle(self) -> None:
+        wait = self._last_request + self.min_interval - time.monotonic()
+        if wait > 0:
+            self._stop.wait(wait)
+        self._last_request = time.monotonic()
+
+    def status(self) -> dict:
+        """Counters and the current schedule, for the status page."""
+        return {
+            **self.counters,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "teams": len(self.schedule),
+            "due": sum(item["due"] for item in self.schedule),
+            "last_cycle": self.last_cycle,
+            "last_snapshot": self.last_snapshot,
+            "last_error": self.last_error,
+            "schedule": self.schedule,
+        }
+
+
+_prefetcher: SquadPrefetcher | None = None
+_prefetcher_lock = threading.Lock()
+
+
+def start() -> SquadPrefetcher | None:
+    """Start the process wide prefetcher once, unless disabled with LADDER_PREFETCH=0."""
+    global _prefetcher
+    if os.environ.get("LADDER_PREFETCH", "1") == "0":
+        return None
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = SquadPrefetcher()
+        _prefetcher.start()
+    return _prefetcher
@@ -0,0 +1,146 @@
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from data_api import rankings_from_dicts, squad_url
+from ladder_table import MOVEMENTS, LadderTable
+
+ALL = "All"
+FACETS = ("Region", "Club", "Position", "Zombie", "Movement")
+SORTS = ("Position", "Team", "Club", "Movement", "Wins", "Losses")
+BAND_EDGES = (10, 25, 50, 100, 250, 500, 1000)  # Last position of each position band but the last
+COLUMNS = ["Position", "Team", "Club", "Region", "Form", "Movement", "Wins", "Losses", "Zombie", "Bonus drop", "Link"]
+
+
+def _bands(positions: np.ndarray) -> np.ndarray:
+    labels = [f"{low + 1}-{high}" for low, high in zip((0, *BAND_EDGES), BAND_EDGES)] + [f"{BAND_EDGES[-1] + 1}+"]
+    return np.array(labels, dtype=object)[np.searchsorted(BAND_EDGES, positions, side="left")]
+
+
+def _rows_by_value(values: np.ndarray) -> dict[str, np.ndarray]:
+    """Rows of every distinct value, each ascending."""
+    return pd.Series(np.arange(len(values))).groupby(values).indices if len(values) else {}
+
+
+def _orders(key: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Rows by ascending and descending key, ties in ladder order."""
+    rows = np.arange(len(key))
+    return np.lexsort((rows, key)).astype(np.int32), np.lexsort((rows, -key)).astype(np.int32)
+
+
+@dataclass
+class RankingsView:
+    """Ladder rankings prepared once per rankings payload, for the rankings page.
+
+    indexes maps every FACETS value to the rows of its teams, ascending, so a filter is
+    a lookup and several filters an intersection of sorted arrays. For every SORTS key,
+    orders holds the rows sorted both ways and ranks each row's place in them, so the
+    unfiltered ladder is a slice of an order and a filtered one is sorted by rank. Only
+    the rows of the page shown are turned into a data frame, see frame().
+    """
+
+    table: LadderTable
+    wins: np.ndarray
+    losses: np.ndarray
+    indexes: dict[str, dict[str, np.ndarray]]
+    orders: dict[tuple[str, bool], np.ndarray]  # (SORTS key, descending): rows
+    ranks: dict[tuple[str, bool], np.ndarray]  # (SORTS key, descending): place of every row in orders
+
+    @classmethod
+    def build(cls, rankings: list[dict]) -> "RankingsView":
+        table = LadderTable.from_rankings(rankings_from_dicts(rankings))
+        wins, losses = table.wins(), table.losses()
+        movements = np.array(MOVEMENTS, dtype=object)[table.movement]
+        indexes = {
+            "Region": _rows_by_value(table.region_id.astype(str)),
+            "Club": _rows_by_value(table.club_name.astype(str)),
+            "Position": _rows_by_value(_bands(table.position)),
+            "Zombie": _rows_by_value(np.where(table.is_zombie, "Zombie", "Active")),
+            "Movement": _rows_by_value(movements),
+        }
+        # Going up is a positive movement, going down a negative one
+        signed_movement = np.where(movements == "▼", -table.movement_amount, table.movement_amount)
+        keys = {
+            "Position": table.position,
+            "Team": np.unique(np.char.lower(table.team_name.astype(str)), return_inverse=True)[1],
+            "Club": np.unique(np.char.lower(table.club_name.astype(str)), return_inverse=True)[1],
+            "Movement": signed_movement,
+            "Wins": wins,
+            "Losses": losses,
+        }
+        orders, ranks = {}, {}
+        for name, key in keys.items():
+            for descending, order in zip((False, True), _orders(key.astype(np.int64))):
+                orders[name, descending] = order
+                ranks[name, descending] = np.empty_like(order)
+                ranks[name, descending][order] = np.arange(len(order), dtype=np.int32)
+        return cls(table, wins, losses, indexes, orders, ranks)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def options(self, facet: str) -> list[str]:
+        """ALL then the values of a facet, position bands in ladder order and the others sorted."""
+        values = list(self.indexes[facet])
+        if facet == "Position":
+            return [ALL, *sorted(values, key=lambda band: int(band.split("-")[0].rstrip("+")))]
+        return [ALL, *sorted(values)]
+
+    def select(self, filters: dict[str, str], sort: str = "Position", descending: bool = False) -> np.ndarray:
+        """Rows of the teams matching every filter, in sort order.
+
+        Args:
+            filters (dict[str, str]): FACETS name: value, ALL or a missing facet does not filter
+            sort (str): One of SORTS
+            descending (bool): Sort descending, ties stay in ladder order
+
+        Returns:
+            np.ndarray: Rows of the table
+
+        """
+        rows = None
+        for facet, value in filters.items():
+            if value == ALL:
+                continue
+            matching = self.indexes[facet].get(value, np.empty(0, dtype=np.intp))
+            rows = matching if rows is None else np.intersect1d(rows, matching, assume_unique=True)
+        if rows is None:
+            return self.orders[sort, descending]
+        return rows[np.argsort(self.ranks[sort, descending][rows])]
+
+    def frame(self, rows: np.ndarray) -> pd.DataFrame:
+        """Teams at the given rows, with COLUMNS."""
+        table = self.table[rows]
+        movement = np.array(MOVEMENTS, dtype=object)[table.movement]
+        amounts = np.where(table.has_movement_amount, table.movement_amount.astype(str), "")
+        return pd.DataFrame(
+            {
+                "Position": table.position,
+                "Team": table.team_name,
+                "Club": table.club_name,
+                "Region": table.region_id,
+                "Form": table.form_strings(),
+                "Movement": [f"{arrow} {amount}".strip() for arrow, amount in zip(movement, amounts)],
+                "Wins": self.wins[rows],
+                "Losses": self.losses[rows],
+                "Zombie": table.is_zombie,
+                "Bonus drop": table.has_bonus_drop,
+                "Link": [squad_url(team_id) for team_id in table.team_id],
+            },
+            columns=COLUMNS,
+        )
+
+
+_cached: tuple[list[dict], RankingsView] | None = None
+_lock = threading.Lock()
+
+
+def get_view(rankings: list[dict]) -> RankingsView:
+    """View of a rankings payload, built again only when the payload object changes."""
+    global _cached
+    with _lock:
+        if _cached is None or _cached[0] is not rankings:
+            _cached = (rankings, RankingsView.build(rankings))
+        return _cached[1]
@@ -0,0 +1,207 @@
+import io
+import re
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+import league
+import tracing
+from league import COLUMNS
+from logger_config import logger
+
+WORD = re.compile(r"\w+")
+
+
+@dataclass
+class RiderIndex:
+    """Every rider of the ladder's squads, indexed by id, team, name and power.
+
+    A rider has one row, with the data of the first squad listing them, and one
+    membership per team they ride for. For every COLUMNS interval, ranking holds the
+    rider rows by descending power, riders without data last, and sorted_power their
+    values in that order, so the best riders or those above a value are a slice.
+    """
+
+    rider_ids: np.ndarray  # int64 (riders,), ascending
+    names: np.ndarray
+    ftp: np.ndarray  # float64, NaN when unknown
+    power: np.ndarray  # float64 (riders, COLUMNS), NaN without data
+    team_ids: np.ndarray
+    team_names: np.ndarray
+    member_riders: np.ndarray  # int32 rider row of every membership, ascending
+    member_teams: np.ndarray  # int32 team row of every membership
+    words: np.ndarray  # Lower case words of the rider names, ascending
+    word_riders: np.ndarray  # int32 rider row of every word
+    ranking: np.ndarray  # int32 (COLUMNS, riders)
+    sorted_power: np.ndarray  # float64 (COLUMNS, riders)
+
+    def __len__(self) -> int:
+        return len(self.rider_ids)
+
+    def row(self, rider_id) -> int | None:
+        """Row of a rider, None if no squad lists them."""
+        i = int(np.searchsorted(self.rider_ids, int(rider_id)))
+        return i if i < len(self) and self.rider_ids[i] == int(rider_id) else None
+
+    def teams_of(self, rider_id) -> list[tuple[str, str]]:
+        """Team ids and names of the teams a rider rides for."""
+        row = self.row(rider_id)
+        if row is None:
+            return []
+        start, stop = np.searchsorted(self.member_riders, [row, row + 1])
+        teams = self.member_teams[start:stop]
+        return list(zip(self.team_ids[teams], self.team_names[teams]))
+
+    def search(self, query: str, limit: int = 20) -> pd.DataFrame:
+        """Riders with a name word starting with each word of the query, e.g. "jo sm" finds John Smith."""
+        rows = None
+        for word in WORD.findall(query.lower()):
+            start, stop = np.searchsorted(self.words, [word, word + "\U0010ffff"])
+            found = np.unique(self.word_riders[start:stop])
+            rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+        if rows is None:
+            rows = np.empty(0, dtype=np.int32)
+        rows = rows[np.argsort(self.names[rows], kind="stable")][:limit]
+        return self.frame(rows)
+
+    def top(self, column: str, n: int = 20) -> pd.DataFrame:
+        """The n riders with the most power for a COLUMNS interval."""
+        c = COLUMNS.index(column)
+        known = int(np.count_nonzero(~np.isnan(self.sorted_power[c])))
+        return self.frame(self.ranking[c, : min(n, known)])
+
+    def above(self, column: str, value: float) -> np.ndarray:
+        """Rows of the riders with more power than value for a COLUMNS interval, best first."""
+        c = COLUMNS.index(column)
+        # sorted_power is descending with NaN last, its negation ascending as searchsorted needs
+        count = np.searchsorted(-self.sorted_power[c], -value, side="left")
+        return self.ranking[c, :count]
+
+    def teams_above(self, column: str, value: float) -> pd.DataFrame:
+        """Teams with a rider above value for a COLUMNS interval, those with the most such riders first."""
+        selected = np.zeros(len(self), dtype=bool)
+        selected[self.above(column, value)] = True
+        members = np.flatnonzero(selected[self.member_riders])
+        teams = self.member_teams[members]
+        best = self.power[self.member_riders[members], COLUMNS.index(column)]
+        df = pd.DataFrame({"Team id": self.team_ids[teams], "Team": self.team_names[teams], "Best": best})
+        df = df.groupby(["Team id", "Team"], as_index=False, sort=False).agg(
+            Riders=("Best", "size"), Best=("Best", "max")
+        )
+        return df.sort_values(["Riders", "Best"], ascending=False, ignore_index=True)
+
+    def frame(self, rows: np.ndarray) -> pd.DataFrame:
+        """Riders at the given rows, with their teams, FTP and power."""
+        df = pd.DataFrame(self.power[rows], columns=COLUMNS)
+        df.insert(0, "Rider id", self.rider_ids[rows])
+        df.insert(1, "Name", self.names[rows])
+        df.insert(2, "Teams", [", ".join(name for _, name in self.teams_of(self.rider_ids[row])) for row in rows])
+        df.insert(3, "FTP", self.ftp[rows])
+        return df
+
+
+def build_rider_index(squads: list[dict]) -> RiderIndex:
+    """Index the riders of the given teams.
+
+    Args:
+        squads (list[dict]): Team data as returned by data_api.get_squad
+
+    Returns:
+        RiderIndex: Riders ordered by id, teams in the order given
+
+    """
+    ids, names, ftps, power, teams = [], [], [], [], []
+    for t, squad in enumerate(squads):
+        for rider in squad.get("roster") or []:
+            ninety = rider["powerMax"]["ninety"]
+            ids.append(int(rider["id"]))
+            names.append(rider["ZPName"])
+            ftps.append(rider["zwiftData"]["ftp"])
+            power.append([ninety.get(column) or np.nan for column in COLUMNS])
+            teams.append(t)
+
+    member_ids = np.array(ids, dtype=np.int64)
+    rider_ids, first, member_riders = np.unique(member_ids, return_index=True, return_inverse=True)
+    power = np.array(power, dtype=np.float64).reshape(-1, len(COLUMNS))[first]
+    league.mask_missing(power)
+    names = np.array(names, dtype=object)[first]
+
+    membership = np.lexsort((np.array(teams), member_riders))
+    words, word_riders = [], []
+    for row, name in enumerate(names):
+        for word in set(WORD.findall(str(name).lower())):
+            words.append(word)
+            word_riders.append(row)
+    words = np.array(words, dtype=str)
+    word_order = np.argsort(words, kind="stable")
+
+    # Negating sorts the most power first, NaN stays last
+    ranking = np.argsort(-power.T, axis=1, kind="stable").astype(np.int32)
+    return RiderIndex(
+        rider_ids=rider_ids,
+        names=names,
+        ftp=np.array([np.nan if ftp is None else ftp for ftp in ftps], dtype=np.float64)[first],
+        power=power,
+        team_ids=np.array([str(squad["id"]) for squad in squads], dtype=object),
+        team_names=np.array([squad["thisteam"].get("name", "") for squad in squads], dtype=object),
+        member_riders=member_riders[membership].astype(np.int32),
+        member_teams=np.array(teams, dtype=np.int32)[membership],
+        words=words[word_order],
+        word_riders=np.array(word_riders, dtype=np.int32)[word_order],
+        ranking=ranking,
+        sorted_power=np.take_along_axis(power.T, ranking, axis=1),
+    )
+
+
+_index: tuple[str, str, RiderIndex] | None = None  # (cached pages state, squads version, index)
+_lock = threading.Lock()  # Held while the index is rebuilt
+
+
+def get_rider_index() -> RiderIndex:
+    """Rider index of every team whose squad is in the disk cache, rebuilt only when one of them changed.
+
+    Nothing is fetched, see league.cached_squads. The index is kept in memory and checked on
+    every call against the versions of the cached team pages, which is one cheap query. While
+    one session rebuilds it, the others keep being served the index they had.
+
+    Returns:
+        RiderIndex: Riders of every cached team
+
+    """
+    global _index
+    state = league.cached_squads_state()
+    current = _index
+    if current is not None and current[0] == state:
+        tracing.count("rider_index", result="memory")
+        return current[2]
+    if not _lock.acquire(blocking=current is None):
+        tracing.count("rider_index", result="stale")
+        return current[2]
+    try:
+        if _index is not None and _index[0] == state:
+            tracing.count("rider_index", result="memory")
+            return _index[2]
+
+        squads, version = league.cached_squads()
+        if _index is not None and _index[1] == version:
+            tracing.count("rider_index", result="memory")
+            index = _index[2]
+        elif (stored := data_cache.get_artifact("rider_index", version)) is not None:
+            tracing.count("rider_index", result="disk")
+            with np.load(io.BytesIO(stored), allow_pickle=True) as arrays:
+                index = RiderIndex(**{name: arrays[name] for name in arrays.files})
+        else:
+            tracing.count("rider_index", result="computed")
+            logger.info(f"Building rider index of {len(squads)} teams")
+            with tracing.span("rider_index.build"):
+                index = build_rider_index(squads)
+            buffer = io.BytesIO()
+            np.savez(buffer, **vars(index))
+            data_cache.put_artifact("rider_index", version, buffer.getvalue())
+        _index = (state, version, index)
+        return index
+    finally:
+        _lock.release()
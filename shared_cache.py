@@ -0,0 +1,286 @@
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any, Protocol
+
+import data_cache
+import tracing
+from logger_config import logger
+from lru import LRU
+
+# "sqlite" shares values through the disk cache file, "redis" through LADDER_REDIS_URL
+BACKEND = os.environ.get("LADDER_CACHE_BACKEND", "sqlite")
+REDIS_URL = os.environ.get("LADDER_REDIS_URL", "redis://localhost:6379/0")
+MAX_MEMORY_ENTRIES = 256
+LEASE_SECONDS = 30  # How long other processes wait for the one loading a key
+POLL_SECONDS = 0.1
+RETRY_SECONDS = 30  # Wait after a failed background refresh before trying again
+
+
+class Backend(Protocol):
+    """Store shared by every process serving the app."""
+
+    def get(self, key: str) -> tuple[bytes, float] | None:
+        """Unexpired value and the time it expires at."""
+
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def acquire(self, key: str, ttl: float) -> bool:
+        """Take the lease to load a key, False if another process holds it."""
+
+    def release(self, key: str) -> None: ...
+
+
+class SQLiteBackend:
+    """Values in the disk cache's SQLite file, shared by the processes of one host or volume."""
+
+    def get(self, key: str) -> tuple[bytes, float] | None:
+        return data_cache.shared_get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        data_cache.shared_set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        data_cache.shared_delete(key)
+
+    def acquire(self, key: str, ttl: float) -> bool:
+        return data_cache.acquire_lease(key, ttl)
+
+    def release(self, key: str) -> None:
+        data_cache.release_lease(key)
+
+
+class RedisBackend:
+    """Values in Redis, or anything speaking its protocol, shared across hosts."""
+
+    def __init__(self, url: str = REDIS_URL):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> tuple[bytes, float] | None:
+        value, ttl_ms = self.client.pipeline().get(key).pttl(key).execute()
+        if value is None or ttl_ms < 0:
+            return None
+        return value, time.time() + ttl_ms / 1000
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def acquire(self, key: str, ttl: float) -> bool:
+        return bool(self.client.set(f"lease:{key}", 1, nx=True, px=int(ttl * 1000)))
+
+    def release(self, key: str) -> None:
+        self.client.delete(f"lease:{key}")
+
+
+def _loaded(value: Any) -> dict:
+    """Wrap a value with its load time, as stored by get_stale_while_revalidate."""
+    return {"loaded_at": time.time(), "value": value}
+
+
+class SharedCache:
+    """Values shared by every session and process, with an in-process LRU in front.
+
+    get_or_load coalesces concurrent misses: within a process, callers of a key being
+    loaded wait for that load, and across processes the backend lease lets one process
+    load while the others poll the backend for its result.
+    """
+
+    def __init__(self, backend: Backend, max_entries: int = MAX_MEMORY_ENTRIES):
+        self.backend = backend
+        self._memory: LRU[str, tuple[Any, float]] = LRU(max_entries)  # key: (value, expires_at)
+        self._inflight: dict[str, Future] = {}
+        self._retry_at: dict[str, float] = {}  # Earliest next background refresh per key, after a failure or skip
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        """Return a cached value, from memory or the shared backend, None when missing."""
+        cached = self._memory.get(key)
+        if cached and cached[1] > time.time():
+            tracing.count("shared_cache", result="memory")
+            return cached[0]
+        stored = self.backend.get(key)
+        if stored is None:
+            return None
+        tracing.count("shared_cache", result="shared")
+        value = data_cache.loads(stored[0])
+        self._memory.put(key, (value, stored[1]))
+        return value
+
+    def get_or_load(self, key: str, load: Callable[[], Any], ttl: float) -> Any:
+        """Return the cached value of a key, loading and storing it on a miss.
+
+        Args:
+            key (str): Cache key, e.g. "squad:1234"
+            load (Callable): Computes the value, which must be serializable by data_cache.dumps
+            ttl (float): Seconds the loaded value is served for
+
+        Returns:
+            Any: The cached or loaded value
+
+        Raises:
+            Exception: Whatever load raised, for the caller that ran it and those waiting on it
+
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            tracing.count("shared_cache", result="coalesced")
+            return future.result()
+
+        try:
+            value = self._load(key, load, ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _load(self, key: str, load: Callable[[], Any], ttl: float) -> Any:
+        # Another thread may have finished loading since our first lookup
+        value = self.get(key)
+        if value is not None:
+            return value
+        # Wait for another process loading the same key rather than loading it again
+        deadline = time.monotonic() + LEASE_SECONDS
+        leased = self.backend.acquire(key, LEASE_SECONDS)
+        while not leased and time.monotonic() < deadline:
+            time.sleep(POLL_SECONDS)
+            value = self.get(key)
+            if value is not None:
+                return value
+            leased = self.backend.acquire(key, LEASE_SECONDS)
+        try:
+            tracing.count("shared_cache", result="miss")
+            value = load()
+            self._store(key, value, ttl)
+            return value
+        finally:
+            if leased:
+                self.backend.release(key)
+
+    def _store(self, key: str, value: Any, ttl: float) -> None:
+        self.backend.set(key, data_cache.dumps(value).encode(), ttl)
+        self._memory.put(key, (value, time.time() + ttl))
+
+    def get_stale_while_revalidate(
+        self, key: str, load: Callable[[], Any], ttl: float, max_stale: float
+    ) -> tuple[Any, float]:
+        """Return the last loaded value at once, refreshing it in the background once stale.
+
+        Only a cold key waits for load. A stale value is still returned and one refresh
+        runs in a background thread, at most one per key across threads and processes.
+        If that refresh fails the stale value keeps being served, up to max_stale seconds
+        after it was loaded, and the refresh is retried after RETRY_SECONDS. While another
+        process holds the refresh lease, this one waits LEASE_SECONDS before trying again
+        and then takes the value that process stored, if it is newer, instead of loading.
+
+        Args:
+            key (str): Cache key
+            load (Callable): Computes the value, which must be serializable by data_cache.dumps
+            ttl (float): Seconds after which the value is refreshed
+            max_stale (float): Seconds the value may be served for while refreshes fail
+
+        Returns:
+            Tuple[Any, float]: The value and its age in seconds
+
+        """
+        entry = self.get(key)
+        if entry is None:
+            entry = self.get_or_load(key, lambda: _loaded(load()), max_stale)
+        age = time.time() - entry["loaded_at"]
+        if age >= ttl:
+            self._refresh_in_background(key, load, max_stale, entry["loaded_at"])
+        return entry["value"], age
+
+    def refresh(self, key: str, load: Callable[[], Any], max_stale: float) -> Any:
+        """Reload a get_stale_while_revalidate key now, while other readers keep the old value."""
+        entry = _loaded(load())
+        self._store(key, entry, max_stale)
+        return entry["value"]
+
+    def _refresh_in_background(self, key: str, load: Callable[[], Any], max_stale: float, loaded_at: float) -> None:
+        with self._lock:
+            if key in self._inflight or time.monotonic() < self._retry_at.get(key, 0):
+                return
+            future = self._inflight[key] = Future()
+
+        def run():
+            try:
+                if not self.backend.acquire(key, LEASE_SECONDS):
+                    # Another process is refreshing this key, give it the time its lease allows
+                    self._retry_at[key] = time.monotonic() + LEASE_SECONDS
+                    tracing.count("shared_cache", result="refresh_skipped")
+                    return
+                try:
+                    stored = self.backend.get(key)
+                    entry = data_cache.loads(stored[0]) if stored else None
+                    if entry is not None and entry["loaded_at"] > loaded_at:
+                        # Another process refreshed it since the stale value was served
+                        self._memory.put(key, (entry, stored[1]))
+                    else:
+                        tracing.count("shared_cache", result="refreshed")
+                        self._store(key, _loaded(load()), max_stale)
+                finally:
+                    self.backend.release(key)
+            except Exception as e:
+                self._retry_at[key] = time.monotonic() + RETRY_SECONDS
+                tracing.count("shared_cache", result="refresh_failed")
+                logger.warning(f"Background refresh of {key} failed, serving stale data: {e}")
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                future.set_result(self.get(key))
+
+        threading.Thread(target=run, name=f"refresh-{key}", daemon=True).start()
+
+    def refreshing(self, key: str) -> bool:
+        """Whether a load or background refresh of a key is running in this process."""
+        with self._lock:
+            return key in self._inflight
+
+    def invalidate(self, *keys: str) -> None:
+        """Drop keys everywhere, so the next read of each loads it again."""
+        for key in keys:
+            self._memory.pop(key)
+            self.backend.delete(key)
+
+
+_cache: SharedCache | None = None
+_cache_lock = threading.Lock()
+
+
+def _make_backend() -> Backend:
+    if BACKEND == "redis":
+        try:
+            return RedisBackend()
+        except ImportError:
+            logger.warning("LADDER_CACHE_BACKEND=redis needs the redis package, using sqlite instead")
+    return SQLiteBackend()
+
+
+def get_cache() -> SharedCache:
+    """Process wide cache, using the backend selected by LADDER_CACHE_BACKEND."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SharedCache(_make_backend())
+    return _cache
@@ -0,0 +1,205 @@
+import json
+import pickle
+import threading
+import warnings
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+import tracing
+from data_plots import WKG_COLUMNS, W_COLUMNS, team_power_stats
+from data_stats import ZP_PROFILE_URL, build_rosters, compare_rosters
+from lru import LRU
+
+MAX_MEMORY_TEAMS = 512
+ARTIFACT_REVISION = 3  # Bump when TeamRoster or its frame's dtypes change, so older pickles are not diffed against
+STATS = ("mean", "max", "min")  # Team statistics kept per roster, those of the Match page
+
+
+def squad_version(team: dict) -> str:
+    """Version of a squad, hashing its content for squads cached before versions existed."""
+    return team.get("version") or data_cache.version_of(json.dumps(team, sort_keys=True).encode())
+
+
+@dataclass
+class RosterDiff:
+    """Riders who joined or left a team, or whose FTP or power data changed."""
+
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+
+@dataclass
+class TeamRoster:
+    """A team's roster as last seen, with its roster rows and statistics."""
+
+    version: str
+    name: str
+    riders: dict[str, tuple]  # Rider id: (position in the roster, signature of the rider's row), see _riders
+    ids: np.ndarray  # Rider id of every frame row
+    frame: pd.DataFrame  # Rows of data_stats.build_rosters for this team
+    stats: pd.DataFrame  # data_plots.team_power_stats of the frame, for STATS
+
+
+def _riders(roster: list[dict]) -> dict[str, tuple]:
+    # The signature holds everything build_rosters reads, flat tuples pickle far faster than dicts
+    riders = {}
+    for position, rider in enumerate(roster):
+        ninety = rider["powerMax"]["ninety"]
+        signature = (rider["ZPName"], rider["zwiftData"]["ftp"], tuple(ninety), tuple(ninety.values()))
+        riders[str(rider["id"])] = (position, signature)
+    return riders
+
+
+def diff_riders(old: dict[str, tuple], new: dict[str, tuple]) -> RosterDiff:
+    """Compare two TeamRoster.riders, a rider who only moved in the roster is unchanged."""
+    diff = RosterDiff(removed=[rider_id for rider_id in old if rider_id not in new])
+    for rider_id, (_, signature) in new.items():
+        previous = old.get(rider_id)
+        if previous is None:
+            diff.added.append(rider_id)
+        elif previous[1] != signature:
+            diff.changed.append(rider_id)
+    return diff
+
+
+def _team_stats(frame: pd.DataFrame, name: str) -> pd.DataFrame:
+    """data_plots.team_power_stats of a single team's rows, without the cost of a groupby."""
+    values = frame[W_COLUMNS + WKG_COLUMNS].astype("Float64").to_numpy(dtype="float64", na_value=np.nan)
+    has_watts = values[:, : len(W_COLUMNS)] > 0
+    values[~np.hstack([has_watts, has_watts])] = np.nan
+    reduce = {"mean": np.nanmean, "max": np.nanmax, "min": np.nanmin}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Intervals without data are NaN
+        by_stat = [reduce[stat](values, axis=0) for stat in STATS]
+    return pd.DataFrame(
+        [np.column_stack(by_stat).ravel()],
+        index=[name],
+        columns=pd.MultiIndex.from_product([W_COLUMNS + WKG_COLUMNS, STATS]),
+    )
+
+
+def _frame_ids(frame: pd.DataFrame) -> np.ndarray:
+    return np.array([link[len(ZP_PROFILE_URL) :] for link in frame["ZP"]], dtype=object)
+
+
+def _build(squad: dict, version: str, riders: dict[str, tuple]) -> TeamRoster:
+    frame = build_rosters([squad])
+    name = squad["thisteam"]["name"]
+    return TeamRoster(version, name, riders, _frame_ids(frame), frame, _team_stats(frame, name))
+
+
+def _update(previous: TeamRoster, squad: dict, version: str, riders: dict[str, tuple], diff: RosterDiff) -> TeamRoster:
+    """Replace the rows of the riders in diff, building rows for those riders only."""
+    keep = ~np.isin(previous.ids, diff.removed + diff.changed)
+    frames, ids = [previous.frame[keep]], [previous.ids[keep]]
+    rebuilt = [squad["roster"][riders[rider_id][0]] for rider_id in diff.added + diff.changed]
+    if rebuilt:
+        rows = build_rosters([{**squad, "roster": rebuilt}])
+        frames.append(rows)
+        ids.append(_frame_ids(rows))
+    frame = pd.concat(frames, ignore_index=True)
+    ids = np.concatenate(ids)
+
+    # Same order as a full build: FTP descending, missing FTPs last, ties in roster order
+    ftp = frame["FTP"].astype("Float64").to_numpy(dtype="float64", na_value=np.nan)
+    order = np.lexsort((np.array([riders[rider_id][0] for rider_id in ids]), np.where(np.isnan(ftp), np.inf, -ftp)))
+    frame = frame.iloc[order].reset_index(drop=True)
+    return TeamRoster(version, previous.name, riders, ids[order], frame, _team_stats(frame, previous.name))
+
+
+class SquadStore:
+    """Last roster of every team, updated by diffing each new version against the previous one.
+
+    A refreshed squad usually differs by a few riders, so only their rows are built
+    again and the team statistics recomputed, instead of the whole roster. Rosters are
+    kept in memory and in the disk cache, so a restarted process still has a base to
+    diff against.
+    """
+
+    def __init__(self, max_teams: int = MAX_MEMORY_TEAMS):
+        self._teams: LRU[str, TeamRoster] = LRU(max_teams)
+
+    def roster(self, squad: dict) -> TeamRoster:
+        """Return the roster of a squad, updating the stored one if the squad changed.
+
+        Args:
+            squad (dict): Team data as returned by data_api.get_squad
+
+        Returns:
+            TeamRoster: Roster rows and statistics of the team
+
+        """
+        team_id, version = str(squad["id"]), squad_version(squad)
+        previous = self._teams.get(team_id)
+        stored = data_cache.latest_artifact(f"roster:{team_id}") if previous is None else None
+        if stored is not None and stored[0].endswith(f":r{ARTIFACT_REVISION}"):
+            previous = pickle.loads(stored[1])
+        if previous is not None and previous.version == version:
+            tracing.count("squad_roster", result="unchanged")
+            self._teams.put(team_id, previous)
+            return previous
+
+        riders = _riders(squad.get("roster") or [])
+        with tracing.span("squad_roster.update"):
+            if previous is None or previous.name != squad["thisteam"]["name"]:
+                tracing.count("squad_roster", result="built")
+                roster = _build(squad, version, riders)
+            else:
+                diff = diff_riders(previous.riders, riders)
+                for change in ("added", "removed", "changed"):
+                    tracing.count("squad_roster_riders", len(getattr(diff, change)), change=change)
+                if len(diff) > len(riders) // 2:
+                    # Rebuilding most of the rows costs more than building them all
+                    tracing.count("squad_roster", result="built")
+                    roster = _build(squad, version, riders)
+                else:
+                    tracing.count("squad_roster", result="updated")
+                    roster = _update(previous, squad, version, riders, diff)
+        data_cache.put_artifact(
+            f"roster:{team_id}",
+            f"{version}:r{ARTIFACT_REVISION}",
+            pickle.dumps(roster, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+        self._teams.put(team_id, roster)
+        return roster
+
+    def compare(self, home_team: dict, away_team: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Roster frame of two squads, as built by data_stats.compare_rosters, and their statistics.
+
+        Args:
+            home_team (dict): Home squad as returned by data_api.get_squad
+            away_team (dict): Away squad as returned by data_api.get_squad
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame]: Roster frame and data_plots.team_power_stats of it
+
+        """
+        home, away = self.roster(home_team), self.roster(away_team)
+        if home.name == away.name:
+            # Both teams' rows are interleaved by FTP then, build them together
+            df = compare_rosters(home_team, away_team)
+            return df, team_power_stats(df, STATS)
+        # compare_rosters sorts by team name, descending
+        first, second = (home, away) if home.name > away.name else (away, home)
+        df = pd.concat([first.frame, second.frame], ignore_index=True)
+        return df, pd.concat([first.stats, second.stats])
+
+
+_store: SquadStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SquadStore:
+    """Process wide squad store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SquadStore()
+    return _store
@@ -0,0 +1,46 @@
+"""The vectorized countdowns of the fixtures page match the original per row formatting.
+
+Run with `python -m unittest discover tests` or `python -m pytest tests`.
+"""
+
+import random
+import sys
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "benchmarks")]
+
+import data_api  # noqa: E402
+import fixtures_view  # noqa: E402
+import synthetic  # noqa: E402
+from data_api import format_timedelta, format_timedeltas  # noqa: E402
+
+# Around zero, the hour, the day and the 24h switch to the day format
+EDGES = [-86400.0, -1.0, -0.5, 0.0, 0.5, 59.9, 60.0, 3599.99, 3600.0, 86399.0, 86400.0, 89999.0, 90000.0, 1e7]
+
+
+class FormatTimedeltasTest(unittest.TestCase):
+    def test_matches_format_timedelta(self):
+        rnd = random.Random(5)
+        seconds = EDGES + [rnd.uniform(-1e5, 1e6) for _ in range(2000)]
+        expected = [format_timedelta(timedelta(seconds=s)) for s in seconds]
+        self.assertEqual(format_timedeltas(np.array(seconds)).tolist(), expected)
+
+    def test_fixture_countdowns_match_the_original_page(self):
+        fixtures = data_api.parse_fixtures(synthetic.summary_html(n_days=3, per_day=30, seed=7))
+        view = fixtures_view.FixturesView.build(fixtures)
+        now = datetime.now()
+        df = view.at(now)
+        # The page formatted every row with format_timedelta before FixturesView
+        expected = [format_timedelta(start - now) for start in df["date_time"]]
+        self.assertEqual(df["Go Time"].tolist(), expected)
+        team = view.teams[1]
+        self.assertEqual(view.at(now, team)["Go Time"].tolist(), df["Go Time"].iloc[view.team_rows[team]].tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
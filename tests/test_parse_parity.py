@@ -0,0 +1,132 @@
+"""The page parsers give the same output with every parser backend.
+
+expected/ holds what the original BeautifulSoup parsers, from before data_parse existed,
+returned for the pages in benchmarks/fixtures. Every backend must still return exactly
+that. Pages recorded from the real site with `python benchmarks/mock_server.py record
+--out <dir>` are checked too when LADDER_RECORDED_PAGES points at that directory; there
+is no expected output for them, so the backends are compared with each other.
+
+Run with `python -m unittest discover tests` or `python -m pytest tests`.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import unittest
+from dataclasses import asdict
+from datetime import date
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "benchmarks")]
+
+import data_api  # noqa: E402
+import data_cache  # noqa: E402
+import data_parse  # noqa: E402
+import synthetic  # noqa: E402
+
+EXPECTED_DIR = Path(__file__).parent / "expected"
+RECORDED_DIR = os.environ.get("LADDER_RECORDED_PAGES")
+RECORDED_ON = date(2026, 10, 18)  # "Today" on the fixture summary page
+BACKENDS = [backend for backend in data_parse.BACKENDS if backend != "lxml" or importlib.util.find_spec("lxml")]
+CHUNK_SIZE = 1000
+
+
+class _RecordedDate(date):
+    @classmethod
+    def today(cls):
+        return RECORDED_ON
+
+
+def _plain(data):
+    """Data as stored in the JSON of expected/, dates tagged as data_cache.dumps does."""
+    return json.loads(data_cache.dumps(data))
+
+
+def _fixtures(html: str) -> list[dict]:
+    return _plain(data_api.parse_fixtures(html))
+
+
+def _streamed_fixtures(html: str) -> list[dict]:
+    chunks = (html[i : i + CHUNK_SIZE] for i in range(0, len(html), CHUNK_SIZE))
+    return _plain(list(data_api.iter_fixtures(chunks)))
+
+
+def _rankings(html: str) -> list[dict]:
+    return _plain([asdict(ranking) for ranking in data_api.parse_ladder_table(html)])
+
+
+def _squad(html: str, team_id: int) -> dict:
+    squad = data_api.parse_squad(html, team_id)
+    squad.pop("version")
+    return _plain(squad)
+
+
+def _outputs(pages: Path) -> dict[str, object]:
+    """Output of every parser on the pages of a directory saved by mock_server.py record."""
+    outputs = {}
+    if (pages / "summary.html").exists():
+        html = (pages / "summary.html").read_text(encoding="utf-8")
+        outputs["summary"] = _fixtures(html)
+        outputs["summary streamed"] = _streamed_fixtures(html)
+    if (pages / "ladder.html").exists():
+        outputs["ladder"] = _rankings((pages / "ladder.html").read_text(encoding="utf-8"))
+    for path in sorted(pages.glob("openteam_*.html")):
+        outputs[path.stem] = _squad(path.read_text(encoding="utf-8"), int(path.stem.split("_")[1]))
+    return outputs
+
+
+class ParserBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.previous = data_parse.get_parser_backend()
+        patch = mock.patch.object(data_api, "date", _RecordedDate)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        data_parse.set_parser_backend(self.previous)
+
+    def outputs_by_backend(self, pages: Path) -> dict[str, dict[str, object]]:
+        outputs = {}
+        for backend in BACKENDS:
+            data_parse.set_parser_backend(backend)
+            outputs[backend] = _outputs(pages)
+        return outputs
+
+    def test_fixture_pages_match_the_original_parsers(self):
+        for backend, outputs in self.outputs_by_backend(synthetic.FIXTURES_DIR).items():
+            for name, output in outputs.items():
+                with self.subTest(backend=backend, page=name):
+                    expected = json.loads((EXPECTED_DIR / f"{name.split()[0]}.json").read_text(encoding="utf-8"))
+                    self.assertEqual(output, expected)
+
+    def test_generated_pages_match_across_backends(self):
+        pages = {
+            "summary": (_fixtures, synthetic.summary_html(n_days=5, per_day=40, seed=3)),
+            "ladder": (_rankings, synthetic.ladder_html(n_teams=1000, seed=4)),
+            "squad": (lambda html: _squad(html, 303), synthetic.squad_html(303, n_riders=30)),
+        }
+        for name, (parse, html) in pages.items():
+            outputs = {}
+            for backend in BACKENDS:
+                data_parse.set_parser_backend(backend)
+                outputs[backend] = parse(html)
+            for backend in BACKENDS[1:]:
+                with self.subTest(backend=backend, page=name):
+                    self.assertTrue(outputs[backend])
+                    self.assertEqual(outputs[backend], outputs[BACKENDS[0]])
+
+    @unittest.skipUnless(RECORDED_DIR, "set LADDER_RECORDED_PAGES to a directory saved by mock_server.py record")
+    def test_recorded_pages_match_across_backends(self):
+        outputs = self.outputs_by_backend(Path(RECORDED_DIR))
+        self.assertTrue(outputs[BACKENDS[0]], f"No recorded pages in {RECORDED_DIR}")
+        for backend in BACKENDS[1:]:
+            for name, output in outputs[backend].items():
+                with self.subTest(backend=backend, page=name):
+                    self.assertEqual(output, outputs[BACKENDS[0]][name])
+
+
+if __name__ == "__main__":
+    unittest.main()
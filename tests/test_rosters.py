@@ -0,0 +1,88 @@
+"""data_stats.build_rosters gives the frame the original dict per rider implementation built.
+
+Run with `python -m unittest discover tests` or `python -m pytest tests`.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "benchmarks")]
+
+import synthetic  # noqa: E402
+from data_stats import COL_BASE, COL_OTHER, COL_WATTS, COL_WKG, build_rosters  # noqa: E402
+
+NUMERIC = ["FTP", *COL_WATTS, *COL_WKG, *COL_OTHER]
+
+
+def reference_rosters(teams: list[dict]) -> pd.DataFrame:
+    """The roster frame as data_stats.compare_rosters built it before build_rosters."""
+    frames = []
+    for team in teams:
+        riders = [
+            {
+                "Team": team["thisteam"]["name"],
+                "Name": rider["ZPName"],
+                "ZP": f"https://zwiftpower.com/profile.php?z={rider['id']}",
+                "ZR": f"https://www.zwiftracing.app/riders/{rider['id']}",
+                "FTP": rider["zwiftData"]["ftp"],
+                **rider["powerMax"]["ninety"],
+            }
+            for rider in team.get("roster") or []
+        ]
+        if riders:
+            df = pd.DataFrame(riders)
+            df[COL_WATTS + COL_WKG] = df[COL_WATTS + COL_WKG].replace(0, pd.NA)
+            frames.append(df)
+    df = pd.concat(frames, axis=0)
+    df.sort_values(by=["Team", "FTP"], ascending=False, inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def comparable(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame with float64 numeric columns, missing values as NaN, so both implementations compare."""
+    df = df[COL_BASE + COL_WATTS + COL_WKG + COL_OTHER].copy()
+    for column in NUMERIC:
+        df[column] = pd.to_numeric(df[column].astype(object).where(df[column].notna(), np.nan)).astype("float64")
+    return df
+
+
+def squad(team_id: int, ftps: list) -> dict:
+    """Synthetic squad with the given FTPs, distinct so that both sorts agree on the order."""
+    team = synthetic.squad_payload(team_id, len(ftps)) | {"id": team_id}
+    for rider, ftp in zip(team["roster"], ftps):
+        rider["zwiftData"]["ftp"] = ftp
+    return team
+
+
+class BuildRostersTest(unittest.TestCase):
+    def assert_matches_reference(self, teams: list[dict]) -> pd.DataFrame:
+        df = build_rosters(teams)
+        pd.testing.assert_frame_equal(comparable(df), comparable(reference_rosters(teams)))
+        return df
+
+    def test_integer_ftps(self):
+        df = self.assert_matches_reference([squad(1, [250, 310, 199]), squad(2, [280, 301])])
+        self.assertEqual(str(df["FTP"].dtype), "Float64")
+
+    def test_fractional_and_missing_ftps(self):
+        df = self.assert_matches_reference([squad(1, [250.5, 312.25, None, 199]), squad(2, [280, 300.7])])
+        self.assertEqual(df["FTP"].tolist()[:3], [300.7, 280, 312.25])
+        self.assertTrue(pd.isna(df["FTP"].iloc[-1]))
+
+    def test_team_without_roster(self):
+        self.assert_matches_reference([squad(1, [250, 310]), {"id": 3, "thisteam": {"name": "Team 3"}, "roster": []}])
+
+    def test_no_riders(self):
+        df = build_rosters([{"id": 3, "thisteam": {"name": "Team 3"}, "roster": []}])
+        self.assertEqual(len(df), 0)
+        self.assertEqual(str(df["FTP"].dtype), "Float64")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""Rosters updated from rider diffs are the rosters a full build_rosters rebuild gives.
+
+Run with `python -m unittest discover tests` or `python -m pytest tests`.
+"""
+
+import copy
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "benchmarks")]
+
+import data_cache  # noqa: E402
+import squad_store  # noqa: E402
+import synthetic  # noqa: E402
+from data_plots import team_power_stats  # noqa: E402
+from data_stats import compare_rosters  # noqa: E402
+
+
+def squad(team_id: int, n_riders: int, version: str) -> dict:
+    return synthetic.squad_payload(team_id, n_riders) | {"id": team_id, "version": version}
+
+
+def new_rider(rider_id: int, ftp) -> dict:
+    rider = synthetic.squad_payload(rider_id, 1)["roster"][0]
+    rider["id"] = rider_id
+    rider["zwiftData"]["ftp"] = ftp
+    return rider
+
+
+class SquadStoreTest(unittest.TestCase):
+    def setUp(self):
+        # Memory only, nothing is read from or written to the disk cache
+        patch = mock.patch.object(data_cache, "_connect", return_value=None)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.store = squad_store.SquadStore()
+        self.home = squad(101, 30, "h0")
+        self.away = squad(202, 25, "a0")
+        # An FTP tie and a missing FTP, whose order the update must keep as a rebuild would
+        roster = self.home["roster"]
+        roster[3]["zwiftData"]["ftp"] = roster[5]["zwiftData"]["ftp"]
+        roster[7]["zwiftData"]["ftp"] = None
+        self.assert_matches_rebuild()
+
+    def assert_matches_rebuild(self):
+        df, stats = self.store.compare(self.home, self.away)
+        expected = compare_rosters(self.home, self.away)
+        pd.testing.assert_frame_equal(df, expected)
+        pd.testing.assert_frame_equal(stats.sort_index(), team_power_stats(expected, squad_store.STATS).sort_index())
+
+    def update(self, change) -> squad_store.RosterDiff:
+        """Apply change to a copy of the home squad, check the roster is updated and not rebuilt."""
+        previous = self.store.roster(self.home)
+        self.home = copy.deepcopy(self.home)
+        self.home["version"] += "+"
+        change(self.home["roster"])
+        diff = squad_store.diff_riders(previous.riders, squad_store._riders(self.home["roster"]))
+        with mock.patch.object(squad_store, "_build", wraps=squad_store._build) as build:
+            self.assert_matches_rebuild()
+        build.assert_not_called()
+        return diff
+
+    def test_added_riders(self):
+        diff = self.update(lambda roster: roster.extend([new_rider(900001, 290), new_rider(900002, None)]))
+        self.assertEqual(diff.added, ["900001", "900002"])
+        self.assertEqual(diff.removed + diff.changed, [])
+
+    def test_removed_riders(self):
+        removed = [str(self.home["roster"][i]["id"]) for i in (2, 7)]
+        diff = self.update(lambda roster: [roster.pop(7), roster.pop(2)])
+        self.assertEqual(sorted(diff.removed), sorted(removed))
+        self.assertEqual(diff.added + diff.changed, [])
+
+    def test_changed_riders(self):
+        def change(roster):
+            roster[0]["zwiftData"]["ftp"] = roster[4]["zwiftData"]["ftp"]
+            roster[1]["zwiftData"]["ftp"] = 301.5
+            roster[2]["powerMax"]["ninety"]["w300"] += 5
+            roster[6]["powerMax"]["ninety"]["w60"] = 0
+            roster[8]["ZPName"] = "Renamed rider"
+
+        diff = self.update(change)
+        self.assertEqual(len(diff.changed), 5)
+        self.assertEqual(diff.added + diff.removed, [])
+
+    def test_reordered_riders_are_unchanged(self):
+        diff = self.update(lambda roster: roster.reverse())
+        self.assertEqual(len(diff), 0)
+
+    def test_added_removed_and_changed_together(self):
+        def change(roster):
+            roster.pop(10)
+            roster.append(new_rider(900003, 305))
+            roster[0]["powerMax"]["ninety"]["wkg1200"] = 4.4
+
+        diff = self.update(change)
+        self.assertEqual((len(diff.added), len(diff.removed), len(diff.changed)), (1, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
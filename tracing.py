@@ -0,0 +1,258 @@
+import bisect
+import contextvars
+import cProfile
+import functools
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Coroutine, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from logger_config import logger
+
+METRICS_PATH = Path(os.environ.get("LADDER_METRICS_PATH", Path(__file__).parent / ".cache" / "metrics.txt"))
+METRICS_SECONDS = float(os.environ.get("LADDER_METRICS_SECONDS", "10"))  # Least time between metrics file writes
+# Set LADDER_PROFILE=1 to dump a cProfile file of every page run into PROFILE_DIR
+PROFILE = os.environ.get("LADDER_PROFILE", "0") == "1"
+PROFILE_DIR = Path(os.environ.get("LADDER_PROFILE_DIR", Path(__file__).parent / ".cache" / "profiles"))
+PREFIX = "ladder"
+# Upper bounds, in seconds, of the span duration histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class _Histogram:
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+    count: int = 0
+    total: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+
+@dataclass
+class Trace:
+    """Stages of one page run, in the order they finished."""
+
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    stages: list[tuple[str, float]] = field(default_factory=list)
+    elapsed: float | None = None
+
+    def summary(self) -> dict[str, float]:
+        """Total seconds per stage. Concurrent stages, like parallel fetches, add up."""
+        totals: dict[str, float] = defaultdict(float)
+        for name, seconds in self.stages:
+            totals[name] += seconds
+        return dict(totals)
+
+
+_lock = threading.Lock()
+_histograms: dict[tuple[str, tuple], _Histogram] = defaultdict(_Histogram)
+_counters: dict[tuple[str, tuple], float] = defaultdict(float)
+_metrics_written_at = -float("inf")  # time.monotonic() of the last metrics file write
+_profile_lock = threading.Lock()  # Held by the page run being profiled
+_current: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("ladder_trace", default=None)
+
+
+def _key(name: str, labels: dict[str, str]) -> tuple[str, tuple]:
+    return name, tuple(sorted(labels.items()))
+
+
+def _observe(name: str, labels: dict[str, str], seconds: float) -> None:
+    with _lock:
+        _histograms[_key(name, labels)].observe(seconds)
+
+
+@contextmanager
+def span(name: str, **labels: str) -> Iterator[None]:
+    """Time a stage, adding it to the span histograms and to the current page run's trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _observe(name, labels, seconds)
+        trace = _current.get()
+        if trace is not None:
+            trace.stages.append((name, seconds))
+
+
+def traced(name: str):
+    """Decorator running every call of a function in a span."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, value: float = 1, **labels: str) -> None:
+    """Increase a counter, e.g. count("cache", page="squad", result="hit")."""
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def bind(coro: Coroutine[Any, Any, Any]) -> Coroutine[Any, Any, Any]:
+    """Carry the current trace into a coroutine that runs on another thread's event loop."""
+    trace = _current.get()
+    if trace is None:
+        return coro
+
+    async def bound():
+        _current.set(trace)
+        return await coro
+
+    return bound()
+
+
+@contextmanager
+def request(name: str) -> Iterator[Trace]:
+    """Trace a page run: its spans are collected, logged and the metrics file rewritten.
+
+    With LADDER_PROFILE=1 the run is also profiled with cProfile and the stats dumped to
+    PROFILE_DIR, one file per run. Python allows one active profiler per process, so while
+    one session's run is profiled the runs of the others are not. Fetches on the data_http
+    event loop show up as time spent waiting on their result.
+    """
+    trace = Trace(name)
+    token = _current.set(trace)
+    profiler = cProfile.Profile() if PROFILE and _profile_lock.acquire(blocking=False) else None
+    try:
+        if profiler:
+            try:
+                profiler.enable()
+            except ValueError as e:  # A profiler this module did not start, e.g. a debugger's
+                logger.warning(f"{name} run not profiled: {e}")
+                _profile_lock.release()
+                profiler = None
+        yield trace
+    finally:
+        if profiler:
+            profiler.disable()
+            _profile_lock.release()
+        _current.reset(token)
+        trace.elapsed = time.perf_counter() - trace.started
+        _observe("request", {"page": name}, trace.elapsed)
+        stages = ", ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in trace.summary().items())
+        logger.info(f"{name} run took {trace.elapsed * 1000:.0f}ms: {stages}")
+        if profiler:
+            _dump_profile(profiler, name)
+        _write_metrics_due()
+
+
+def show_timings(trace: Trace) -> None:
+    """Show the stages of a finished page run in a collapsed Timings section of the page.
+
+    Streamlit and pandas are imported here so that importing tracing stays cheap.
+    """
+    import pandas as pd
+    import streamlit as st
+
+    with st.expander("⏱️ Timings"):
+        st.caption(f"Page run took {trace.elapsed * 1000:.0f} ms")
+        stages = [{"Stage": stage, "ms": seconds * 1000} for stage, seconds in trace.summary().items()]
+        st.dataframe(pd.DataFrame(stages), hide_index=True)
+
+
+def _dump_profile(profiler: cProfile.Profile, name: str) -> None:
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILE_DIR / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{time.monotonic_ns() % 1000000}.prof"
+        profiler.dump_stats(path)
+        logger.info(f"Profile written to {path}")
+    except OSError as e:
+        logger.warning(f"Cannot write profile: {e}")
+
+
+def _labels(labels: tuple, **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+def export() -> str:
+    """All counters and span histograms in the OpenMetrics text format."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: (list(h.buckets), h.count, h.total) for key, h in _histograms.items()}
+
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {PREFIX}_{name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{PREFIX}_{name}_total{_labels(labels)} {value:g}")
+
+    lines.append(f"# TYPE {PREFIX}_span_seconds histogram")
+    lines.append(f"# UNIT {PREFIX}_span_seconds seconds")
+    for (name, labels), (buckets, total_count, total) in sorted(histograms.items()):
+        span_labels = (("span", name), *labels)
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, buckets):
+            cumulative += bucket
+            lines.append(f"{PREFIX}_span_seconds_bucket{_labels(span_labels, le=str(bound))} {cumulative}")
+        lines.append(f"{PREFIX}_span_seconds_bucket{_labels(span_labels, le='+Inf')} {total_count}")
+        lines.append(f"{PREFIX}_span_seconds_count{_labels(span_labels)} {total_count}")
+        lines.append(f"{PREFIX}_span_seconds_sum{_labels(span_labels)} {total:.6f}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: Path = METRICS_PATH) -> None:
+    """Rewrite the metrics file for a scraper (node_exporter textfile collector or similar).
+
+    Each write goes to its own temporary file that then replaces the metrics file, so
+    concurrent writers never leave a partial file behind.
+    """
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False, encoding="utf-8"
+        ) as f:
+            tmp = Path(f.name)
+            f.write(export())
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Cannot write metrics to {path}: {e}")
+        if tmp is not None:
+            tmp.unlink(missing_ok=True)
+
+
+def _write_metrics_due() -> None:
+    """Write the metrics file if METRICS_SECONDS passed since the last write of this process."""
+    global _metrics_written_at
+    with _lock:
+        now = time.monotonic()
+        if now - _metrics_written_at < METRICS_SECONDS:
+            return
+        _metrics_written_at = now
+    write_metrics()
+
+
+def snapshot() -> dict:
+    """Counters and span totals as plain rows, for the status page."""
+    with _lock:
+        counters = sorted(_counters.items())
+        spans = sorted((key, h.count, h.total) for key, h in _histograms.items())
+    return {
+        "counters": [{"name": name, **dict(labels), "value": value} for (name, labels), value in counters],
+        "spans": [
+            {"span": name, **dict(labels), "count": n, "total_ms": total * 1000, "mean_ms": total * 1000 / n}
+            for (name, labels), n, total in spans
+        ],
+    }